@@ -1,10 +1,10 @@
 from fastapi import APIRouter, Depends, status, HTTPException
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.db import session as database
 from app.models import schemas
-from app.core import jwt_token
-from app.core.hashing import Hash
+from app.core import hashing, jwt_token
 from app.db.session import User
 
 router = APIRouter(
@@ -12,12 +12,17 @@ router = APIRouter(
 )
 
 @router.post('/login')
-def login(request: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(database.get_db)):
-    user = db.query(User).filter(User.username == request.username).first()
+async def login(request: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(database.get_async_db)):
+    user = (await db.execute(select(User).where(User.username == request.username))).scalar_one_or_none()
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Invalid Credentials")
-    if not Hash.verify(user.password, request.password):
+    valid, new_hash = await hashing.verify_password(user.password, request.password)
+    if not valid:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Incorrect password")
+    if new_hash:
+        # Stored with a different cost factor than configured; upgrade it while we have the password
+        user.password = new_hash
+        await db.commit()
 
-    access_token = jwt_token.create_access_token(data={"sub": user.username})
+    access_token = jwt_token.create_access_token(data={"sub": user.username, "uid": user.id})
     return {"access_token": access_token, "token_type": "bearer"}
@@ -1,8 +1,8 @@
 from fastapi import APIRouter, Depends, status, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.db import session as database
 from app.models import schemas
-from app.core.hashing import Hash
+from app.core import hashing
 from app.db.session import User
 
 router = APIRouter(
@@ -10,9 +10,10 @@ router = APIRouter(
 )
 
 @router.post('/user', response_model=schemas.User)
-def create_user(request: schemas.UserCreate, db: Session = Depends(database.get_db)):
-    new_user = User(username=request.username, email=request.email, password=Hash.bcrypt(request.password))
+async def create_user(request: schemas.UserCreate, db: AsyncSession = Depends(database.get_async_db)):
+    hashed_password = await hashing.hash_password(request.password)
+    new_user = User(username=request.username, email=request.email, password=hashed_password)
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
     return new_user
@@ -1,82 +1,139 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends
-from sqlalchemy.orm import Session
-from app.db.session import SessionLocal, AnalysisResult, User
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from app.db.session import AsyncSessionLocal, AnalysisResult
 from app.core import oauth2
-import json
+from app.services.status_events import TERMINAL_STATUSES, broadcaster
 import asyncio
 
 router = APIRouter(
     tags=['WebSockets']
 )
 
+# Without any event for this long, the database is checked once in case an event was lost
+RESYNC_INTERVAL_SECONDS = 30
+
+
+def _serialize_analysis(analysis: AnalysisResult) -> dict:
+    return {
+        "id": analysis.id,
+        "task_id": analysis.task_id,
+        "status": analysis.status,
+        "progress": analysis.progress,
+        "stage": analysis.stage,
+        "stage_timings": analysis.stage_timings,
+        "raw_text_extracted": analysis.raw_text_extracted,
+        "factual_report_json": analysis.factual_report_json,
+        "reliability_score": analysis.reliability_score,
+        "error_message": analysis.error_message,
+        "domain_inferred": analysis.domain_inferred,
+        "owner_id": analysis.owner_id,
+        "video_id": analysis.video_id,
+        "created_at": analysis.created_at.isoformat(),
+        "updated_at": analysis.updated_at.isoformat() if analysis.updated_at else None,
+        "video": {
+            "id": analysis.video.id,
+            "url": analysis.video.url,
+            "title": analysis.video.title,
+            "description": analysis.video.description,
+            "duration_seconds": analysis.video.duration_seconds,
+            "thumbnail_url": analysis.video.thumbnail_url,
+            "uploaded_at": analysis.video.uploaded_at.isoformat() if analysis.video.uploaded_at else None,
+            "channel_name": analysis.video.channel_name,
+            "created_at": analysis.video.created_at.isoformat(),
+            "updated_at": analysis.video.updated_at.isoformat() if analysis.video.updated_at else None,
+        },
+        "claims": [
+            {
+                "id": claim.id,
+                "claim_text": claim.claim_text,
+                "evidence_summary": claim.evidence_summary,
+                "score": claim.score,
+                "analysis_result_id": claim.analysis_result_id,
+                "created_at": claim.created_at.isoformat(),
+                "updated_at": claim.updated_at.isoformat() if claim.updated_at else None,
+            }
+            for claim in analysis.claims
+        ]
+    }
+
+
+async def _load_snapshot(db: AsyncSession, analysis_id: int) -> dict:
+    query = (
+        select(AnalysisResult)
+        .options(selectinload(AnalysisResult.video), selectinload(AnalysisResult.claims))
+        .where(AnalysisResult.id == analysis_id)
+    )
+    return _serialize_analysis((await db.execute(query)).scalar_one())
+
+
+async def _load_status(db: AsyncSession, analysis_id: int) -> dict:
+    status, progress, stage = (
+        await db.execute(
+            select(AnalysisResult.status, AnalysisResult.progress, AnalysisResult.stage)
+            .where(AnalysisResult.id == analysis_id)
+        )
+    ).one()
+    return {"status": status, "progress": progress, "stage": stage}
+
+
+async def _reload(loader, analysis_id: int) -> dict:
+    # A short session per read, so an idle connection is not held for the whole websocket lifetime
+    async with AsyncSessionLocal() as db:
+        return await loader(db, analysis_id)
+
+
 @router.websocket("/ws/status/{task_id}")
 async def websocket_status_updates(
     websocket: WebSocket,
     task_id: str,
     token: str,
-    db: Session = Depends(SessionLocal)
 ):
-    try:
-        user = oauth2.get_current_user(token=token, db=db)
-    except Exception as e:
-        await websocket.close(code=1008, reason=f"Authentication failed: {e}")
-        return
+    """
+    Sends the analysis once, then only what changes, as the worker publishes it.
+    Messages are {"task_id", "type": "snapshot" | "delta", "analysis": {...}}.
+    """
+    async with AsyncSessionLocal() as db:
+        try:
+            user = await oauth2.get_current_user(token=token, db=db)
+        except Exception as e:
+            await websocket.close(code=1008, reason=f"Authentication failed: {e}")
+            return
 
-    analysis = db.query(AnalysisResult).filter(AnalysisResult.task_id == task_id).first()
+        analysis = (await db.execute(select(AnalysisResult).where(AnalysisResult.task_id == task_id))).scalars().first()
+        if not analysis or analysis.owner_id != user.id:
+            await websocket.close(code=1008, reason="Analysis not found or not authorized")
+            return
 
-    if not analysis or analysis.owner_id != user.id:
-        await websocket.close(code=1008, reason="Analysis not found or not authorized")
-        return
+        analysis_id = analysis.id
+        # Requests attached to another in-flight analysis follow that analysis's events
+        channel_task_id = analysis.task_id
+        if analysis.source_analysis_id and analysis.status not in TERMINAL_STATUSES:
+            source = await db.get(AnalysisResult, analysis.source_analysis_id)
+            if source:
+                channel_task_id = source.task_id
 
     await websocket.accept()
     try:
-        while True:
-            db.refresh(analysis)
-            await websocket.send_json({
-                "task_id": analysis.task_id,
-                "analysis": {
-                    "id": analysis.id,
-                    "task_id": analysis.task_id,
-                    "status": analysis.status,
-                    "progress": analysis.progress,
-                    "raw_text_extracted": analysis.raw_text_extracted,
-                    "factual_report_json": analysis.factual_report_json,
-                    "reliability_score": analysis.reliability_score,
-                    "error_message": analysis.error_message,
-                    "domain_inferred": analysis.domain_inferred,
-                    "owner_id": analysis.owner_id,
-                    "video_id": analysis.video_id,
-                    "created_at": analysis.created_at.isoformat(),
-                    "updated_at": analysis.updated_at.isoformat() if analysis.updated_at else None,
-                    "video": {
-                        "id": analysis.video.id,
-                        "url": analysis.video.url,
-                        "title": analysis.video.title,
-                        "description": analysis.video.description,
-                        "duration_seconds": analysis.video.duration_seconds,
-                        "thumbnail_url": analysis.video.thumbnail_url,
-                        "uploaded_at": analysis.video.uploaded_at.isoformat() if analysis.video.uploaded_at else None,
-                        "channel_name": analysis.video.channel_name,
-                        "created_at": analysis.video.created_at.isoformat(),
-                        "updated_at": analysis.video.updated_at.isoformat() if analysis.video.updated_at else None,
-                    },
-                    "claims": [
-                        {
-                            "id": claim.id,
-                            "claim_text": claim.claim_text,
-                            "evidence_summary": claim.evidence_summary,
-                            "score": claim.score,
-                            "analysis_result_id": claim.analysis_result_id,
-                            "created_at": claim.created_at.isoformat(),
-                            "updated_at": claim.updated_at.isoformat() if claim.updated_at else None,
-                        }
-                        for claim in analysis.claims
-                    ]
-                }
-            })
-            if analysis.status == "completed" or analysis.status == "failed":
-                break
-            await asyncio.sleep(2) # Send updates every 2 seconds
+        # Subscribe before taking the snapshot so no change falls in between
+        async with broadcaster.subscribe(channel_task_id) as events:
+            snapshot = await _reload(_load_snapshot, analysis_id)
+            await websocket.send_json({"task_id": task_id, "type": "snapshot", "analysis": snapshot})
+            status = snapshot["status"]
+            while status not in TERMINAL_STATUSES:
+                try:
+                    delta = await asyncio.wait_for(events.get(), timeout=RESYNC_INTERVAL_SECONDS)
+                except asyncio.TimeoutError:
+                    delta = await _reload(_load_status, analysis_id)
+                status = delta.get("status", status)
+                if status in TERMINAL_STATUSES:
+                    # Send the final result in full, read from this request's own row
+                    final = await _reload(_load_snapshot, analysis_id)
+                    await websocket.send_json({"task_id": task_id, "type": "snapshot", "analysis": final})
+                    break
+                await websocket.send_json({"task_id": task_id, "type": "delta", "analysis": delta})
+        await websocket.close()
     except WebSocketDisconnect:
         print(f"Client disconnected from task {task_id}")
     except Exception as e:
@@ -1,6 +1,24 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException, status
 from passlib.context import CryptContext
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt cost factor; hashes made with any other cost are rehashed on the next successful login
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", 12))
+# Threads hashing passwords (bcrypt releases the GIL), and how many requests may wait for one
+HASH_WORKERS = int(os.environ.get("HASH_WORKERS", 2))
+HASH_MAX_PENDING = int(os.environ.get("HASH_MAX_PENDING", 16))
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
 
 
 class Hash():
@@ -8,4 +26,39 @@ class Hash():
         return pwd_context.hash(password)
 
     def verify(hashed_password, plain_password):
-        return pwd_context.verify(plain_password, hashed_password)
\ No newline at end of file
+        return pwd_context.verify(plain_password, hashed_password)
+
+    def verify_and_update(hashed_password, plain_password):
+        """Returns (valid, new_hash); new_hash is set when the stored hash uses an outdated cost."""
+        return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+_executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="password-hash")
+_pending = 0
+_pending_lock = threading.Lock()
+
+
+async def _run(func, *args):
+    """Runs a hashing call on the bounded pool, rejecting the request with 429 when the queue is full."""
+    global _pending
+    with _pending_lock:
+        if _pending >= HASH_MAX_PENDING:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many login attempts in progress, please retry shortly",
+                headers={"Retry-After": "1"},
+            )
+        _pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_executor, func, *args)
+    finally:
+        with _pending_lock:
+            _pending -= 1
+
+
+async def hash_password(password: str) -> str:
+    return await _run(Hash.bcrypt, password)
+
+
+async def verify_password(hashed_password: str, plain_password: str):
+    return await _run(Hash.verify_and_update, hashed_password, plain_password)
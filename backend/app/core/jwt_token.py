@@ -1,5 +1,6 @@
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
+from app.models import schemas
 
 SECRET_KEY = "your_secret_key"  # Replace with a strong, secret key
 ALGORITHM = "HS256"
@@ -12,12 +13,13 @@ def create_access_token(data: dict):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def verify_token(token: str, credentials_exception):
+def verify_token(token: str, credentials_exception) -> schemas.TokenData:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
-        return username
+        # Tokens issued before `uid` was added only carry the username
+        return schemas.TokenData(username=username, user_id=payload.get("uid"))
     except JWTError:
         raise credentials_exception
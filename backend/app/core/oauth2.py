@@ -1,21 +1,35 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from app.core import jwt_token
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core import jwt_token, user_cache
 from app.db import session as database
 from app.db.session import User
+from app.models import schemas
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(database.get_async_db)) -> schemas.User:
+    """Resolves the user behind a token, from the user cache when the token carries its id."""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    username = jwt_token.verify_token(token, credentials_exception)
-    user = db.query(User).filter(User.username == username).first()
-    if user is None:
+    token_data = jwt_token.verify_token(token, credentials_exception)
+    if token_data.user_id is not None:
+        user = await user_cache.get_user(token_data.user_id)
+        if user is not None and user.username == token_data.username:
+            return user
+        query = select(User).where(User.id == token_data.user_id)
+    else:
+        query = select(User).where(User.username == token_data.username)
+
+    db_user = (await db.execute(query)).scalar_one_or_none()
+    # A renamed user's older tokens no longer match
+    if db_user is None or db_user.username != token_data.username:
         raise credentials_exception
+    user = schemas.User.model_validate(db_user)
+    await user_cache.set_user(user)
     return user
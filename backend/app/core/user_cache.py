@@ -0,0 +1,109 @@
+"""
+Short-lived cache of authenticated users.
+
+Tokens carry the user's id (`uid`), so resolving the user behind a request is a
+cache lookup rather than a database query. Entries live in a small in-process
+LRU, optionally backed by Redis so API processes share them, and expire after
+USER_CACHE_TTL_SECONDS. Any ORM update or delete of a user drops its entry.
+
+Configuration (environment):
+    USER_CACHE_TTL_SECONDS  how long a user is trusted without a database read (default 60, 0 disables)
+    USER_CACHE_SIZE         users kept per process (default 1024)
+    USER_CACHE_REDIS_URL    Redis to share entries between processes; unset keeps the cache in-process
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import redis.asyncio as aioredis
+from sqlalchemy import event
+
+from app.db.session import User
+from app.models import schemas
+
+logger = logging.getLogger(__name__)
+
+USER_CACHE_TTL_SECONDS = float(os.environ.get("USER_CACHE_TTL_SECONDS", 60))
+USER_CACHE_SIZE = int(os.environ.get("USER_CACHE_SIZE", 1024))
+USER_CACHE_REDIS_URL = os.environ.get("USER_CACHE_REDIS_URL")
+
+_local = OrderedDict() # user_id -> (expires_at, schemas.User)
+_local_lock = threading.Lock()
+_redis = aioredis.from_url(USER_CACHE_REDIS_URL) if USER_CACHE_REDIS_URL else None
+
+
+def _key(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+def _remember_local(user: schemas.User):
+    with _local_lock:
+        _local[user.id] = (time.monotonic() + USER_CACHE_TTL_SECONDS, user)
+        _local.move_to_end(user.id)
+        while len(_local) > USER_CACHE_SIZE:
+            _local.popitem(last=False)
+
+
+def _forget_local(user_id: int):
+    with _local_lock:
+        _local.pop(user_id, None)
+
+
+async def get_user(user_id: int) -> Optional[schemas.User]:
+    if USER_CACHE_TTL_SECONDS <= 0:
+        return None
+    with _local_lock:
+        entry = _local.get(user_id)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                _local.move_to_end(user_id)
+                return entry[1]
+            del _local[user_id]
+
+    if _redis is not None:
+        try:
+            cached = await _redis.get(_key(user_id))
+            if cached is not None:
+                user = schemas.User.model_validate_json(cached)
+                _remember_local(user)
+                return user
+        except Exception as e:
+            logger.warning(f"Could not read cached user {user_id}: {e}")
+    return None
+
+
+async def set_user(user: schemas.User):
+    if USER_CACHE_TTL_SECONDS <= 0:
+        return
+    _remember_local(user)
+    if _redis is not None:
+        try:
+            await _redis.set(_key(user.id), user.model_dump_json(), ex=max(int(USER_CACHE_TTL_SECONDS), 1))
+        except Exception as e:
+            logger.warning(f"Could not cache user {user.id}: {e}")
+
+
+async def invalidate_user(user_id: int):
+    """Drops a user from every cache layer; call after changing a user outside the ORM."""
+    _forget_local(user_id)
+    if _redis is not None:
+        try:
+            await _redis.delete(_key(user_id))
+        except Exception as e:
+            logger.warning(f"Could not invalidate cached user {user_id}: {e}")
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _on_user_changed(mapper, connection, target):
+    _forget_local(target.id)
+    if _redis is not None:
+        try:
+            asyncio.get_running_loop().create_task(invalidate_user(target.id))
+        except RuntimeError:
+            # Changed outside the event loop (e.g. a script); the Redis entry expires on its own
+            pass
@@ -0,0 +1,179 @@
+"""
+Lightweight, idempotent schema migrations.
+
+`Base.metadata.create_all` only creates missing tables; it never alters existing
+ones. Every schema change to an existing table is therefore recorded here as an
+ordered, named step. Applied steps are tracked in `schema_migrations`, and each
+step is written so that re-running it against a freshly created schema is a no-op.
+
+Run manually with `python -m app.db.migrations`; the API also runs pending
+migrations on startup.
+"""
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from app.db.session import engine
+
+logger = logging.getLogger(__name__)
+
+
+VIDEO_METADATA_COLUMNS = ("title", "description", "duration_seconds", "thumbnail_url", "uploaded_at", "channel_name")
+
+
+def _merge_duplicate_videos(conn: Connection):
+    """Backfills canonical video identities and merges rows that point at the same video."""
+    from app.services.video_identity import canonicalize_url
+
+    rows = conn.execute(text(
+        f"SELECT id, url, {', '.join(VIDEO_METADATA_COLUMNS)} FROM videos ORDER BY id"
+    )).mappings().all()
+
+    groups = {}
+    for row in rows:
+        try:
+            identity = canonicalize_url(row["url"])
+        except ValueError:
+            identity = None
+        key = (identity.platform, identity.video_id) if identity else ("invalid", str(row["id"]))
+        groups.setdefault(key, (identity, []))[1].append(row)
+
+    for (platform, video_id), (identity, members) in groups.items():
+        survivor, duplicates = members[0], members[1:]
+        values = {"id": survivor["id"], "platform": platform, "video_id": video_id,
+                  "url": identity.url if identity else survivor["url"]}
+        # Keep whatever metadata any of the duplicates had already fetched
+        for column in VIDEO_METADATA_COLUMNS:
+            values[column] = next((m[column] for m in members if m[column] is not None), None)
+
+        if duplicates:
+            duplicate_ids = [m["id"] for m in duplicates]
+            logger.info(f"Merging videos {duplicate_ids} into {survivor['id']} ({platform}:{video_id})")
+            conn.execute(
+                text("UPDATE analysis_results SET video_id = :id WHERE video_id = ANY(:duplicates)"),
+                {"id": survivor["id"], "duplicates": duplicate_ids},
+            )
+            conn.execute(text("DELETE FROM videos WHERE id = ANY(:duplicates)"), {"duplicates": duplicate_ids})
+
+        assignments = ", ".join(f"{c} = :{c}" for c in VIDEO_METADATA_COLUMNS)
+        conn.execute(
+            text(f"UPDATE videos SET url = :url, platform = :platform, platform_video_id = :video_id, {assignments} WHERE id = :id"),
+            values,
+        )
+
+
+def _convert_report_to_jsonb(conn: Connection):
+    """Moves reports to JSONB and unwraps the ones that were stored as a JSON-encoded string."""
+    data_type = conn.execute(text(
+        "SELECT data_type FROM information_schema.columns "
+        "WHERE table_name = 'analysis_results' AND column_name = 'factual_report_json'"
+    )).scalar()
+    if data_type == "json":
+        conn.execute(text(
+            "ALTER TABLE analysis_results ALTER COLUMN factual_report_json TYPE JSONB "
+            "USING factual_report_json::jsonb"
+        ))
+    conn.execute(text(
+        "UPDATE analysis_results SET factual_report_json = (factual_report_json #>> '{}')::jsonb "
+        "WHERE jsonb_typeof(factual_report_json) = 'string'"
+    ))
+
+
+MIGRATIONS = [
+    (
+        "0001_analysis_result_cache",
+        [
+            "ALTER TABLE analysis_results ADD COLUMN IF NOT EXISTS pipeline_version VARCHAR",
+            "ALTER TABLE analysis_results ADD COLUMN IF NOT EXISTS content_hash VARCHAR",
+            "ALTER TABLE analysis_results ADD COLUMN IF NOT EXISTS completed_at TIMESTAMP",
+            "ALTER TABLE analysis_results ADD COLUMN IF NOT EXISTS source_analysis_id INTEGER REFERENCES analysis_results(id)",
+            "CREATE INDEX IF NOT EXISTS ix_analysis_results_pipeline_version ON analysis_results (pipeline_version)",
+            "CREATE INDEX IF NOT EXISTS ix_analysis_results_content_hash ON analysis_results (content_hash)",
+            "CREATE INDEX IF NOT EXISTS ix_analysis_results_source_analysis_id ON analysis_results (source_analysis_id)",
+            "CREATE INDEX IF NOT EXISTS ix_analysis_results_video_status ON analysis_results (video_id, status)",
+        ],
+    ),
+    (
+        "0002_canonical_video_identity",
+        [
+            "ALTER TABLE videos ADD COLUMN IF NOT EXISTS platform VARCHAR",
+            "ALTER TABLE videos ADD COLUMN IF NOT EXISTS platform_video_id VARCHAR",
+            _merge_duplicate_videos,
+            "ALTER TABLE videos ALTER COLUMN platform SET NOT NULL",
+            "ALTER TABLE videos ALTER COLUMN platform_video_id SET NOT NULL",
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_videos_platform_video_id ON videos (platform, platform_video_id)",
+        ],
+    ),
+    (
+        "0003_analysis_stage_progress",
+        [
+            "ALTER TABLE analysis_results ADD COLUMN IF NOT EXISTS stage VARCHAR",
+            "ALTER TABLE analysis_results ADD COLUMN IF NOT EXISTS stage_timings JSON",
+        ],
+    ),
+    (
+        "0004_analysis_history_index",
+        [
+            "CREATE INDEX IF NOT EXISTS ix_analysis_results_owner_created "
+            "ON analysis_results (owner_id, created_at DESC, id DESC)",
+        ],
+    ),
+    (
+        "0005_analysis_report_jsonb",
+        [_convert_report_to_jsonb],
+    ),
+    (
+        "0006_user_analysis_stats_backfill",
+        [
+            # The table itself is created by create_all; this seeds it from the existing history
+            "INSERT INTO user_analysis_stats (user_id, total_analyses, completed_count, failed_count, "
+            "reliability_sum, reliability_count, reliability_min, reliability_max, claims_verified, last_activity_at) "
+            "SELECT a.owner_id, count(*), "
+            "count(*) FILTER (WHERE a.status = 'completed'), "
+            "count(*) FILTER (WHERE a.status = 'failed'), "
+            "coalesce(sum(a.reliability_score) FILTER (WHERE a.status = 'completed'), 0), "
+            "count(a.reliability_score) FILTER (WHERE a.status = 'completed'), "
+            "min(a.reliability_score) FILTER (WHERE a.status = 'completed'), "
+            "max(a.reliability_score) FILTER (WHERE a.status = 'completed'), "
+            "coalesce(sum(c.claim_count) FILTER (WHERE a.status = 'completed'), 0), "
+            "max(coalesce(a.updated_at, a.created_at)) "
+            "FROM analysis_results a "
+            "LEFT JOIN (SELECT analysis_result_id, count(*) AS claim_count FROM claims GROUP BY analysis_result_id) c "
+            "ON c.analysis_result_id = a.id "
+            "GROUP BY a.owner_id "
+            "ON CONFLICT (user_id) DO NOTHING",
+        ],
+    ),
+]
+
+
+def _apply_step(conn: Connection, step):
+    if callable(step):
+        step(conn)
+    else:
+        conn.execute(text(step))
+
+
+def run_migrations(bind: Engine = engine):
+    """Applies every migration that has not been recorded in `schema_migrations` yet."""
+    with bind.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "name VARCHAR PRIMARY KEY, applied_at TIMESTAMP NOT NULL DEFAULT now())"
+        ))
+        applied = {row[0] for row in conn.execute(text("SELECT name FROM schema_migrations"))}
+
+    for name, steps in MIGRATIONS:
+        if name in applied:
+            continue
+        logger.info(f"Applying migration {name}")
+        with bind.begin() as conn:
+            for step in steps:
+                _apply_step(conn, step)
+            conn.execute(text("INSERT INTO schema_migrations (name) VALUES (:name)"), {"name": name})
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    run_migrations()
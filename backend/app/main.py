@@ -1,19 +1,28 @@
-import json
-from typing import List
+from typing import Optional
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, BackgroundTasks, Depends, HTTPException
+from fastapi import FastAPI, BackgroundTasks, Depends, HTTPException, Query
 from pydantic import BaseModel
 import uuid
 from app.worker.celery_worker import analyze_video_task
-from app.db.session import engine, Base, SessionLocal
-from app.db.session import AnalysisResult, User, Video
+from app.db.session import engine, Base
+from app.db.session import AnalysisResult, UserAnalysisStats, Video
 from app.api import user, authentication, websocket
 from app.models import schemas
 from app.core import oauth2
 from app.db import session as database
-from sqlalchemy.orm import Session
+from app.db.migrations import run_migrations
+from app.services import llm, result_cache, user_stats
+from app.services.pagination import decode_cursor, encode_cursor
+from app.services.status_events import broadcaster
+from app.services.video_identity import canonicalize_url
+from sqlalchemy import select, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, contains_eager, defer, load_only, noload, selectinload, undefer
+from sqlalchemy.orm.attributes import set_committed_value
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi_limiter import FastAPILimiter
 from fastapi_limiter.depends import RateLimiter
 import redis.asyncio as redis
@@ -21,15 +30,18 @@ import redis.asyncio as redis
 import os
 
 Base.metadata.create_all(bind=engine)
+run_migrations(engine)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     redis_url = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
     r = redis.from_url(redis_url, decode_responses=True)
     await FastAPILimiter.init(r)
+    await broadcaster.start()
     yield
+    await broadcaster.stop()
 
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 origins = [
     "http://localhost",
@@ -51,68 +63,186 @@ app.include_router(websocket.router)
 
 class AnalyzeRequest(BaseModel):
     url: str
+    force: bool = False # Re-run the analysis even if a cached result exists
 
-@app.post("/analyze", status_code=201, dependencies=[Depends(RateLimiter(times=5, seconds=60))]) # 5 requests per minute
-async def analyze_content(request: AnalyzeRequest, background_tasks: BackgroundTasks, db: Session = Depends(database.get_db), current_user: User = Depends(oauth2.get_current_user)):
-    # Check if video already exists
-    video = db.query(Video).filter(Video.url == request.url).first()
+def _create_analysis(db: Session, identity, owner_id: int, force: bool):
+    """Gets or creates the video and its new analysis, attached to a cached or in-flight one when possible."""
+    # Check if video already exists, under any of its URL variants
+    video_query = db.query(Video).filter(Video.platform == identity.platform, Video.platform_video_id == identity.video_id)
+    video = video_query.first()
     if not video:
-        video = Video(url=request.url)
+        video = Video(url=identity.url, platform=identity.platform, platform_video_id=identity.video_id)
         db.add(video)
-        db.commit()
-        db.refresh(video)
+        try:
+            db.commit()
+            db.refresh(video)
+        except IntegrityError:
+            # Another request created the same video concurrently
+            db.rollback()
+            video = video_query.one()
 
     new_analysis = AnalysisResult(
         task_id=str(uuid.uuid4()),
-        owner_id=current_user.id,
+        owner_id=owner_id,
         video_id=video.id,
-        status="starting"
+        status="starting",
+        pipeline_version=result_cache.PIPELINE_VERSION,
     )
+
+    source = None
+    if not force:
+        result_cache.lock_video(db, video.id)
+        source = result_cache.find_completed_analysis(db, video.id) or result_cache.find_in_flight_analysis(db, video.id)
+
     db.add(new_analysis)
+    db.flush()
+    user_stats.record_created(db, owner_id)
+    if source is not None:
+        new_analysis.source_analysis_id = source.id
+        if source.status == "completed":
+            result_cache.copy_results(db, source, new_analysis)
+        else:
+            new_analysis.status = source.status
+            new_analysis.progress = source.progress
     db.commit()
     db.refresh(new_analysis)
-    background_tasks.add_task(analyze_video_task.delay, new_analysis.id)
-    return {"status": "processing", "task_id": new_analysis.task_id}
+    return new_analysis, source is not None
+
+
+def _analysis_query():
+    return select(AnalysisResult).options(selectinload(AnalysisResult.video), selectinload(AnalysisResult.claims))
+
+
+# Fields of an analysis that can be large; /analysis/{id} returns them unless `fields` narrows the selection
+DETAIL_FIELDS = ("raw_text_extracted", "factual_report_json", "claims")
+
+
+def _summary_query():
+    """Only the columns the history list shows, with the claim count computed in the database."""
+    return (
+        select(AnalysisResult)
+        .join(AnalysisResult.video)
+        .options(
+            load_only(
+                AnalysisResult.id, AnalysisResult.task_id, AnalysisResult.status, AnalysisResult.progress,
+                AnalysisResult.reliability_score, AnalysisResult.domain_inferred,
+                AnalysisResult.created_at, AnalysisResult.updated_at, AnalysisResult.owner_id, AnalysisResult.video_id,
+            ),
+            undefer(AnalysisResult.claim_count),
+            contains_eager(AnalysisResult.video).load_only(
+                Video.id, Video.url, Video.title, Video.thumbnail_url, Video.channel_name,
+            ),
+        )
+    )
+
+
+@app.post("/analyze", status_code=201, dependencies=[Depends(RateLimiter(times=5, seconds=60))]) # 5 requests per minute
+async def analyze_content(request: AnalyzeRequest, background_tasks: BackgroundTasks, db: AsyncSession = Depends(database.get_async_db), current_user: schemas.User = Depends(oauth2.get_current_user)):
+    try:
+        identity = canonicalize_url(request.url)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # The cache decision relies on row locks and ORM helpers shared with the worker, so it runs as one sync unit
+    new_analysis, cached = await db.run_sync(_create_analysis, identity, current_user.id, request.force)
+
+    if not cached:
+        background_tasks.add_task(analyze_video_task.delay, new_analysis.id)
+        return {"status": "processing", "task_id": new_analysis.task_id, "cached": False}
+    return {"status": new_analysis.status, "task_id": new_analysis.task_id, "cached": True}
 
 
 @app.get("/status/{task_id}", response_model=schemas.AnalysisResult)
-async def get_status(task_id: str, db: Session = Depends(database.get_db), current_user: User = Depends(oauth2.get_current_user)):
-    result = db.query(AnalysisResult).filter(AnalysisResult.task_id == task_id).first()
+async def get_status(task_id: str, db: AsyncSession = Depends(database.get_async_db), current_user: schemas.User = Depends(oauth2.get_current_user)):
+    result = (await db.execute(_analysis_query().where(AnalysisResult.task_id == task_id))).scalars().first()
     if result:
         if result.owner_id == current_user.id:
-            if result.status == "completed":
-                result.factual_report_json = json.loads(result.factual_report_json)
             return result
         else:
             raise HTTPException(status_code=403, detail="Not authorized to access this task")
     raise HTTPException(status_code=404, detail="Analysis not found")
 
+async def _user_stats(db: AsyncSession, user_id: int) -> dict:
+    return user_stats.summarize(await db.get(UserAnalysisStats, user_id))
+
+
 @app.get("/history", response_model=schemas.PaginatedAnalysisResults)
 async def get_history(
     skip: int = 0,
-    limit: int = 5,
-    db: Session = Depends(database.get_db),
-    current_user: User = Depends(oauth2.get_current_user)
+    limit: int = Query(5, ge=1, le=100),
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user: schemas.User = Depends(oauth2.get_current_user)
 ):
-    query = db.query(AnalysisResult).filter(AnalysisResult.owner_id == current_user.id).order_by(AnalysisResult.created_at.desc())
-    total_analyses = query.count()
-    history = query.offset(skip).limit(limit).all()
-
-    final = []
-    if history:
-        for result in history:
-            if result.status == "completed":
-                result.factual_report_json = json.loads(result.factual_report_json)
-            final.append(result)
-    return {"total": total_analyses, "analyses": final}
+    """
+    Newest analyses first. Pass the returned `next_cursor` as `cursor` to get the next page;
+    `skip` is still accepted for page jumps but gets slower the deeper it goes.
+    """
+    query = (
+        _summary_query()
+        .where(AnalysisResult.owner_id == current_user.id)
+        .order_by(AnalysisResult.created_at.desc(), AnalysisResult.id.desc())
+    )
+    if cursor:
+        try:
+            cursor_created_at, cursor_id = decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        query = query.where(tuple_(AnalysisResult.created_at, AnalysisResult.id) < tuple_(cursor_created_at, cursor_id))
+    elif skip:
+        query = query.offset(skip)
+    # One extra row tells whether there is a next page
+    rows = (await db.execute(query.limit(limit + 1))).scalars().all()
+    history = rows[:limit]
+
+    next_cursor = encode_cursor(history[-1].created_at, history[-1].id) if len(rows) > limit else None
+    total_analyses = (await _user_stats(db, current_user.id))["total_analyses"] if include_total else None
+    return {"total": total_analyses, "analyses": history, "next_cursor": next_cursor}
 
 @app.get("/analysis/{analysis_id}", response_model=schemas.AnalysisResult)
-async def get_analysis_details(analysis_id: int, db: Session = Depends(database.get_db), current_user: User = Depends(oauth2.get_current_user)):
-    result = db.query(AnalysisResult).filter(AnalysisResult.id == analysis_id).first()
+async def get_analysis_details(
+    analysis_id: int,
+    fields: Optional[str] = Query(None, description=f"Comma-separated subset of {', '.join(DETAIL_FIELDS)}; all by default"),
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user: schemas.User = Depends(oauth2.get_current_user)
+):
+    selected = set(DETAIL_FIELDS)
+    if fields is not None:
+        selected = {field.strip() for field in fields.split(",") if field.strip()}
+        unknown = selected - set(DETAIL_FIELDS)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+
+    options = [selectinload(AnalysisResult.video)]
+    options.append(selectinload(AnalysisResult.claims) if "claims" in selected else noload(AnalysisResult.claims))
+    skipped = [name for name in ("raw_text_extracted", "factual_report_json") if name not in selected]
+    options.extend(defer(getattr(AnalysisResult, name)) for name in skipped)
+    result = (await db.execute(select(AnalysisResult).options(*options).where(AnalysisResult.id == analysis_id))).scalars().first()
     if result:
         if result.owner_id == current_user.id:
-            result.factual_report_json = json.loads(result.factual_report_json)
+            # Fields that were not loaded are returned empty rather than fetched on access
+            for name in skipped:
+                set_committed_value(result, name, None)
             return result
         else:
             raise HTTPException(status_code=403, detail="Not authorized to access this analysis")
     raise HTTPException(status_code=404, detail="Analysis not found")
+
+@app.get("/stats", response_model=schemas.UserStats)
+async def get_stats(db: AsyncSession = Depends(database.get_async_db), current_user: schemas.User = Depends(oauth2.get_current_user)):
+    """Totals and reliability figures over all of the user's analyses, read from a single precomputed row."""
+    return await _user_stats(db, current_user.id)
+
+@app.get("/health/db")
+async def database_health():
+    """Connection pool usage of the API's async engine and the shared sync engine."""
+    return {"async": database.pool_status(database.async_engine), "sync": database.pool_status(engine)}
+
+@app.get("/health/llm-cache")
+def llm_cache_health():
+    """Hit/miss/eviction counters of the LLM response cache shared by the workers."""
+    try:
+        return {"backend": llm.LLM_CACHE_BACKEND, **llm.get_llm_cache().stats()}
+    except Exception as e:
+        return {"backend": llm.LLM_CACHE_BACKEND, "error": str(e)}
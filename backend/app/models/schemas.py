@@ -27,6 +27,7 @@ class Token(BaseModel):
 
 class TokenData(BaseModel):
     username: Optional[str] = None
+    user_id: Optional[int] = None
 
 class VideoBase(BaseModel):
     url: str
@@ -42,6 +43,8 @@ class VideoCreate(VideoBase):
 
 class Video(VideoBase):
     id: int
+    platform: str
+    platform_video_id: str
     created_at: datetime
     updated_at: Optional[datetime]
 
@@ -69,6 +72,8 @@ class AnalysisResultBase(BaseModel):
     task_id: str
     status: str
     progress: float
+    stage: Optional[str] = None
+    stage_timings: Optional[dict] = None
     raw_text_extracted: Optional[str] = None
     factual_report_json: Optional[dict] = None
     reliability_score: Optional[float] = None
@@ -94,13 +99,51 @@ class AnalysisResult(AnalysisResultBase):
 class AgentClaimOutput(BaseModel):
     claim: str # The factual claim extracted.
     evidence_summary: str # A summary of the evidence found for the claim.
-    score: float # A reliability score for the claim (0-100).
+    score: Optional[float] = None # A reliability score for the claim (0-100); None if it could not be verified.
 
 class AgentReportOutput(BaseModel):
     claims: List[AgentClaimOutput] # An array of analyzed claims.
     report: str # A string summarizing the overall findings.
-    overall_score: float # A single float representing the overall reliability score.
+    overall_score: Optional[float] = None # The overall reliability score; None if no claim could be verified.
+
+# Lightweight projections for list views; the transcript, report and claims come from /analysis/{id}
+class VideoSummary(BaseModel):
+    id: int
+    url: str
+    title: Optional[str] = None
+    thumbnail_url: Optional[str] = None
+    channel_name: Optional[str] = None
+
+    class Config:
+        orm_mode = True
+
+class AnalysisSummary(BaseModel):
+    id: int
+    task_id: str
+    status: str
+    progress: float
+    reliability_score: Optional[float] = None
+    domain_inferred: Optional[str] = None
+    claim_count: int = 0
+    created_at: datetime
+    updated_at: Optional[datetime]
+    video: VideoSummary
+
+    class Config:
+        orm_mode = True
 
 class PaginatedAnalysisResults(BaseModel):
-    total: int
-    analyses: List[AnalysisResult]
\ No newline at end of file
+    total: Optional[int] = None # Omitted when the client does not ask for it
+    analyses: List[AnalysisSummary]
+    next_cursor: Optional[str] = None # Pass as `cursor` to get the next page; None on the last page
+
+class UserStats(BaseModel):
+    total_analyses: int
+    completed: int
+    failed: int
+    in_progress: int
+    average_reliability: Optional[float] = None
+    min_reliability: Optional[float] = None
+    max_reliability: Optional[float] = None
+    claims_verified: int
+    last_activity_at: Optional[datetime] = None
@@ -1,20 +1,81 @@
 import logging
+import threading
+import time
 import yt_dlp
-import whisper
 import cv2
-import pytesseract
 import os
-import autogen
-from autogen import AssistantAgent, UserProxyAgent
+from concurrent.futures import ThreadPoolExecutor, wait
+import asyncio
 import json
+import re
+from contextlib import asynccontextmanager
 from datetime import datetime
-from google.genai.types import GoogleSearch
-from moviepy import VideoFileClip
+from typing import Tuple
+
+from app.services.audio import SAMPLE_RATE, decode_audio
+from app.services.chunking import chunk_text, merge_claims
+from app.services.claim_store import CLAIM_CACHE_ENABLED, get_claim_store
+from app.services.frame_sampling import OCR_SAMPLE_FPS, dedupe_lines, iter_sampled_frames, select_changed_frames
+from app.services.llm import LLMClient, get_llm_client
+from app.services.ocr import get_ocr_engine, prepare_frame
+from app.services.progress import StageTracker
+from app.services.search_client import format_results, get_search_client
+from app.services.streaming import iter_stream_audio, iter_stream_frames, resolve_stream
+from app.services.transcription import get_transcription_engine
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 
 # --- Configuration ---
+# Threads per worker process for the independent extraction branches (ASR, OCR).
+# Whisper/torch and the tesseract subprocess both run outside the GIL.
+EXTRACTION_MAX_WORKERS = int(os.environ.get("EXTRACTION_MAX_WORKERS", 2))
+
+# Extraction stages to run: "asr" (speech) and/or "ocr" (on-screen text).
+# Only the streams those stages need are downloaded.
+PIPELINE_STAGES = tuple(stage.strip() for stage in os.environ.get("PIPELINE_STAGES", "asr,ocr").split(",") if stage.strip())
+
+# Captions stay legible for Tesseract well below full resolution.
+OCR_MAX_HEIGHT = int(os.environ.get("OCR_MAX_HEIGHT", 480))
+
+DOWNLOAD_FORMATS = {
+    "audio": "bestaudio/best",
+    # Prefer H.264, which OpenCV can always decode, then any codec, then a muxed file
+    "video": (
+        f"bestvideo[height<={OCR_MAX_HEIGHT}][vcodec^=avc1]/bestvideo[height<={OCR_MAX_HEIGHT}]"
+        f"/best[height<={OCR_MAX_HEIGHT}]/worst"
+    ),
+}
+
+# Stream media into the extractors while it downloads instead of downloading it first
+STREAMING_INGESTION = os.environ.get("STREAMING_INGESTION", "false").lower() == "true"
+# Length of the audio windows transcribed as they arrive in streaming mode
+STREAM_CHUNK_SECONDS = float(os.environ.get("STREAM_CHUNK_SECONDS", 30))
+
+# Claims researched and judged at the same time, and the most claims checked per video
+CLAIM_CONCURRENCY = int(os.environ.get("CLAIM_CONCURRENCY", 4))
+ANALYSIS_MAX_CLAIMS = int(os.environ.get("ANALYSIS_MAX_CLAIMS", 15))
+
+_extraction_pool = None
+_extraction_pool_pid = None
+_extraction_pool_lock = threading.Lock()
+
+
+def _get_extraction_pool() -> ThreadPoolExecutor:
+    """Returns this process's bounded extraction pool (recreated after a fork)."""
+    global _extraction_pool, _extraction_pool_pid
+    with _extraction_pool_lock:
+        if _extraction_pool is None or _extraction_pool_pid != os.getpid():
+            _extraction_pool = ThreadPoolExecutor(max_workers=EXTRACTION_MAX_WORKERS, thread_name_prefix="extraction")
+            _extraction_pool_pid = os.getpid()
+        return _extraction_pool
+
+
+def _run_stage(tracker: StageTracker, stage: str, func, *args):
+    """Runs func as a tracked pipeline stage."""
+    with tracker.stage(stage):
+        return func(*args)
+
 
 # --- Video Processing ---
 def get_video_metadata(url: str):
@@ -47,13 +108,13 @@ def get_video_metadata(url: str):
             return None
 
 
-def download_video(url: str, output_path: str = "temp_videos"):
-    """Downloads a video from a given URL."""
+def download_video(url: str, output_path: str = "temp_videos", format_selector: str = "best", suffix: str = ""):
+    """Downloads a video (or one of its streams, per `format_selector`) from a given URL."""
     if not os.path.exists(output_path):
         os.makedirs(output_path)
     ydl_opts = {
-        'format': 'best',
-        'outtmpl': os.path.join(output_path, '%(id)s.%(ext)s'),
+        'format': format_selector,
+        'outtmpl': os.path.join(output_path, f'%(id)s{suffix}.%(ext)s'),
         'quiet': True,
     }
     with yt_dlp.YoutubeDL(ydl_opts) as ydl:
@@ -61,219 +122,401 @@ def download_video(url: str, output_path: str = "temp_videos"):
         return ydl.prepare_filename(info)
 
 
-# --- Multimodal Data Extraction ---
-whisper_model = whisper.load_model("base")
+def download_media(url: str, stages=PIPELINE_STAGES, tracker: StageTracker = None, output_path: str = "temp_videos"):
+    """
+    Downloads only the streams the given stages need: audio-only for ASR and a
+    low-resolution video for OCR. When both are needed they are fetched in parallel.
+    Returns a dict with "audio" and/or "video" file paths.
+    """
+    tracker = tracker or StageTracker()
+    needed = []
+    if "asr" in stages:
+        needed.append("audio")
+    if "ocr" in stages:
+        needed.append("video")
+
+    pool = _get_extraction_pool()
+    futures = {
+        kind: pool.submit(_run_stage, tracker, f"download_{kind}", download_video, url, output_path, DOWNLOAD_FORMATS[kind], f".{kind}")
+        for kind in needed
+    }
+    wait(list(futures.values()))
+    paths = {}
+    errors = []
+    for kind, future in futures.items():
+        try:
+            paths[kind] = future.result()
+        except Exception as e:
+            errors.append(e)
+    if errors:
+        _remove_files(paths.values())
+        raise errors[0]
+    return paths
+
 
+def _remove_files(paths):
+    for path in paths:
+        if path and os.path.exists(path):
+            os.remove(path)
 
+
+# --- Multimodal Data Extraction ---
 def extract_audio(video_path: str):
-    """Extracts audio from a video file."""
+    """Decodes the audio track of a video file into a 16 kHz mono PCM array."""
     try:
-        video = VideoFileClip(video_path)
-        audio_path = os.path.splitext(video_path)[0] + ".mp3"
-        video.audio.write_audiofile(audio_path, logger=None)
-        video.close() # Explicitly close the video file
-        return audio_path
+        return decode_audio(video_path)
     except Exception as e:
         print(f"Error extracting audio: {e}")
         return None
 
 
-def transcribe_audio(audio_path: str):
-    """Transcribes audio using OpenAI Whisper."""
-    if not audio_path:
+def transcribe_audio(audio, on_progress=None):
+    """
+    Transcribes a PCM array (or audio file) with this worker's warm Whisper engine.
+    `on_progress`, if given, is called with the position (in seconds) reached so far.
+    """
+    if audio is None or len(audio) == 0:
         return ""
     try:
-        result = whisper_model.transcribe(audio_path)
-        return result['text']
+        return get_transcription_engine().transcribe(audio, on_progress=on_progress).text
     except Exception as e:
         logging.exception(f"Error during transcription: {e}")
         return ""
 
 
-def extract_text_from_frames(video_path: str, interval_sec: int = 5):
-    """Extracts text from video frames using Tesseract OCR."""
-    vidcap = None # Initialize vidcap to None
+def _report_positions(frames, on_progress):
+    for timestamp, frame in frames:
+        on_progress(timestamp)
+        yield timestamp, frame
+
+
+def extract_text_from_frames(video_path: str, on_progress=None):
+    """
+    Extracts on-screen text with Tesseract OCR from the text regions of frames where the scene or captions changed.
+    `on_progress`, if given, is called with the timestamp (in seconds) of each sampled frame.
+    """
     try:
-        vidcap = cv2.VideoCapture(video_path)
-        extracted_text = ""
-        for i in range(0, int(vidcap.get(cv2.CAP_PROP_FRAME_COUNT) / vidcap.get(cv2.CAP_PROP_FPS)), interval_sec):
-            vidcap.set(cv2.CAP_PROP_POS_MSEC, i * 1000)
-            success, image = vidcap.read()
-            if success:
-                text = pytesseract.image_to_string(image)
-                if text.strip():
-                    extracted_text += text.strip() + "\n"
-        return extracted_text
+        frames = iter_sampled_frames(video_path)
+        if on_progress:
+            frames = _report_positions(frames, on_progress)
+        crops = []
+        for _, frame in select_changed_frames(frames):
+            crops.extend(prepare_frame(frame))
+        texts = get_ocr_engine().recognize(crops)
+        return "\n".join(dedupe_lines(texts))
     except Exception as e:
         logging.exception(f"Error during OCR: {e}")
         return ""
-    finally:
-        if vidcap: # Ensure vidcap was successfully created before releasing
-            vidcap.release() # Release the video capture object
 
 
-
-def process_video(url: str):
-    """Downloads, processes, and extracts text from a video."""
+def _transcribe_media(media_path: str, tracker: StageTracker):
+    """The ASR branch: audio decoding followed by transcription."""
+    audio = _run_stage(tracker, "audio", extract_audio, media_path)
+    # Without a known duration there is no fraction to report, so the engine can transcribe in one pass
+    on_progress = (lambda position: tracker.media_progress("asr", position)) if tracker.media_duration else None
+    return _run_stage(tracker, "asr", transcribe_audio, audio, on_progress)
+
+
+def _ocr_media(media_path: str, tracker: StageTracker):
+    """The OCR branch."""
+    return _run_stage(tracker, "ocr", extract_text_from_frames, media_path, lambda position: tracker.media_progress("ocr", position))
+
+
+def _skip_unused_stages(tracker: StageTracker, stages, streaming: bool):
+    if "asr" not in stages:
+        tracker.skip("asr")
+    if "asr" not in stages or streaming:
+        tracker.skip("audio")
+    if "ocr" not in stages:
+        tracker.skip("ocr")
+    if streaming:
+        tracker.skip("download")
+
+
+def process_video(url: str, tracker: StageTracker = None, stages=PIPELINE_STAGES):
+    """
+    Downloads, processes, and extracts text from a video.
+    Only the streams needed by `stages` are downloaded; transcription and OCR run
+    concurrently, and stage progress and durations are reported to `tracker`.
+    """
+    if STREAMING_INGESTION:
+        return process_video_stream(url, tracker, stages)
+    tracker = tracker or StageTracker()
+    _skip_unused_stages(tracker, stages, streaming=False)
+    start = time.perf_counter()
+    paths = {}
     try:
-        video_path = download_video(url)
-        if not video_path:
+        paths = _run_stage(tracker, "download", download_media, url, stages, tracker)
+        if not paths:
             return None, "Failed to download video."
-        audio_path = extract_audio(video_path)
-        transcribed_text = transcribe_audio(audio_path)
-        ocr_text = extract_text_from_frames(video_path)
-        if os.path.exists(video_path):
-            os.remove(video_path)
-        if audio_path and os.path.exists(audio_path):
-            os.remove(audio_path)
-        return transcribed_text + "\n" + ocr_text, None
+        pool = _get_extraction_pool()
+        futures = []
+        if "audio" in paths:
+            futures.append(pool.submit(_transcribe_media, paths["audio"], tracker))
+        if "video" in paths:
+            futures.append(pool.submit(_ocr_media, paths["video"], tracker))
+        # Let every branch finish before the downloaded files are removed
+        wait(futures)
+        return "\n".join(future.result() for future in futures), None
     except Exception as e:
         return None, f"An error occurred: {e}"
-
-
-import json
-import re
-
-
-# ... [keep all your existing code until the run_analysis function] ...
-
-def run_analysis(text: str):
-    """Runs the Autogen multi-agent system to analyze the text and returns clean JSON."""
-    config_list = [
-    {
-        "model": "gemini-2.5-flash",
-        "api_key": os.environ.get("GEMINI_API_KEY", "abc"),
-        "api_type": "google"
-    }
-]
-    llm_config = {"config_list": config_list, "cache_seed": 42}
-
-    def search(query: str):
-        """Performs a web search for the given query."""
-        print(f"\n--- Performing web search for: '{query}' ---")
-        try:
-            search_results = GoogleSearch(query=query)
-            if search_results:
-                formatted_results = []
-                for i, result in enumerate(search_results[:3]):
-                    formatted_results.append(f"Result {i + 1}:")
-                    formatted_results.append(f"  Title: {result.get('title', 'N/A')}")
-                    formatted_results.append(f"  Link: {result.get('link', 'N/A')}")
-                    formatted_results.append(f"  Snippet: {result.get('snippet', 'N/A')}")
-                return "\n".join(formatted_results)
-            else:
-                return "No search results found."
-        except Exception as e:
-            return f"An error occurred during web search: {e}"
-
-    # Create agents
-    user_proxy = UserProxyAgent(
-        name="Admin",
-        system_message="A human admin. Interact with the team to verify the claims.",
-        code_execution_config=False,
-        human_input_mode="NEVER",
-        llm_config=llm_config,
-    )
-
-    claim_extractor = AssistantAgent(
-        name="Claim_Extractor",
-        llm_config=llm_config,
-        system_message="Your role is to analyze the provided text and identify all explicit factual claims. Focus on statements that can be objectively verified. Distinguish facts from opinions. Output a JSON array of strings, where each string is a claim.",
+    finally:
+        _remove_files(paths.values())
+        tracker.timings["extraction_total"] = round(time.perf_counter() - start, 2)
+        logging.info(f"Extraction timings for {url}: {tracker.timings}")
+
+
+def transcribe_stream(url: str, tracker: StageTracker = None):
+    """
+    Transcribes the audio stream window by window while it is still downloading.
+    A stream that breaks off raises instead of returning a truncated transcript.
+    """
+    tracker = tracker or StageTracker()
+    stream = resolve_stream(url, DOWNLOAD_FORMATS["audio"])
+    engine = get_transcription_engine()
+    texts = []
+    position = 0.0
+    for chunk in iter_stream_audio(stream, STREAM_CHUNK_SECONDS):
+        texts.append(engine.transcribe(chunk).text)
+        position += len(chunk) / SAMPLE_RATE
+        tracker.media_progress("asr", position)
+    return " ".join(text for text in texts if text)
+
+
+def extract_text_from_stream(url: str, tracker: StageTracker = None):
+    """
+    Runs OCR on changed frames of the low-resolution video stream, batch by batch as frames arrive.
+    A stream that cannot be read or breaks off raises instead of returning partial text.
+    """
+    tracker = tracker or StageTracker()
+    stream = resolve_stream(url, DOWNLOAD_FORMATS["video"])
+    engine = get_ocr_engine()
+    frames = _report_positions(
+        iter_stream_frames(stream, OCR_SAMPLE_FPS, OCR_MAX_HEIGHT),
+        lambda position: tracker.media_progress("ocr", position),
     )
+    texts, pending = [], []
+    for _, frame in select_changed_frames(frames):
+        pending.extend(prepare_frame(frame))
+        if len(pending) >= engine.batch_size:
+            texts.extend(engine.recognize(pending))
+            pending = []
+    texts.extend(engine.recognize(pending))
+    return "\n".join(dedupe_lines(texts))
+
+
+def process_video_stream(url: str, tracker: StageTracker = None, stages=PIPELINE_STAGES):
+    """
+    Streaming variant of process_video: nothing is written to disk, and ASR and OCR
+    consume their streams concurrently while they download.
+    """
+    tracker = tracker or StageTracker()
+    _skip_unused_stages(tracker, stages, streaming=True)
+    start = time.perf_counter()
+    try:
+        pool = _get_extraction_pool()
+        futures = []
+        if "asr" in stages:
+            futures.append(pool.submit(_run_stage, tracker, "asr", transcribe_stream, url, tracker))
+        if "ocr" in stages:
+            futures.append(pool.submit(_run_stage, tracker, "ocr", extract_text_from_stream, url, tracker))
+        return "\n".join(future.result() for future in futures), None
+    except Exception as e:
+        return None, f"An error occurred: {e}"
+    finally:
+        tracker.timings["extraction_total"] = round(time.perf_counter() - start, 2)
+        logging.info(f"Streaming extraction timings for {url}: {tracker.timings}")
 
-    knowledge_seeker = AssistantAgent(
-        name="Knowledge_Seeker",
-        llm_config=llm_config,
-        system_message="You are an expert researcher. Your role is to take the claims identified by the Claim_Extractor and find evidence from reliable sources using the provided search tool. For each claim, provide a summary of the evidence you find.",
-        function_map={"search": search},
-    )
 
-    verdict_generator = AssistantAgent(
-        name="Verdict_Generator",
-        llm_config=llm_config,
-        system_message=f"""Your role is to analyze the claims and the evidence provided by the Knowledge_Seeker. For each claim, determine its veracity and assign a reliability score from 0-100. Then, compile a final report. 
-        Your final output must be a single JSON object conforming to the following Pydantic schema:
+def _parse_claim_list(message):
+    """Reads the Claim_Extractor's JSON array of claims out of a reply; raises ValueError if it has none."""
+    content = message.get("content") if isinstance(message, dict) else message
+    match = re.search(r"\[.*\]", content, re.DOTALL) if isinstance(content, str) else None
+    if not match:
+        raise ValueError("The claim extraction reply contains no JSON array")
+    claims = json.loads(match.group())
+    if not isinstance(claims, list):
+        raise ValueError("The claim extraction reply contains no JSON array")
+    return [claim for claim in claims if isinstance(claim, str) and claim.strip()]
 
-        class AgentClaimOutput(BaseModel):
-            claim: str # The factual claim extracted.
-            evidence_summary: str # A summary of the evidence found for the claim.
-            score: float # A reliability score for the claim (0-100).
 
-        class AgentReportOutput(BaseModel):
-            claims: List[AgentClaimOutput] # An array of analyzed claims.
-            report: str # A string summarizing the overall findings.
-            overall_score: float # A single float representing the overall reliability score.
+def _search(query: str) -> str:
+    """
+    Performs a web search for the given query and formats the results for the research prompt.
+    Search errors are raised, so a claim is never judged against an error message.
+    """
+    return format_results(get_search_client().search(query))
 
-        Provide ONLY the raw JSON output without any Markdown formatting or additional text.""",
-    )
 
-    # Set up the group chat
-    groupchat = autogen.GroupChat(
-        agents=[user_proxy, claim_extractor, knowledge_seeker, verdict_generator],
-        messages=[],
-        max_round=6,
-        speaker_selection_method="round_robin",
-    )
+def _parse_json_object(content: str):
+    """Reads a JSON object out of a model reply, tolerating Markdown fences and surrounding text."""
+    content = content.replace('```json', '').replace('```', '').replace('TERMINATE', '').strip()
+    try:
+        return json.loads(content)
+    except json.JSONDecodeError:
+        match = re.search(r'\{.*\}', content, re.DOTALL)
+        if not match:
+            raise
+        return json.loads(match.group())
+
+
+CLAIM_EXTRACTION_PROMPT = (
+    "Your role is to analyze the provided text and identify all explicit factual claims. "
+    "Focus on statements that can be objectively verified. Distinguish facts from opinions. "
+    "Output a JSON array of strings, where each string is a claim."
+)
+
+CLAIM_VERIFICATION_PROMPT = """You are an expert fact checker. You are given one factual claim and web search results about it.
+Summarize the evidence the results provide for or against the claim, determine its veracity and assign a reliability score from 0-100.
+Your output must be a single JSON object: {"claim": str, "evidence_summary": str, "score": float}
+Provide ONLY the raw JSON output without any Markdown formatting or additional text."""
+
+REPORT_PROMPT = (
+    "You are given fact-checked claims with their evidence summaries and reliability scores (0-100). "
+    "Write a short plain-text report (a few sentences) summarizing the overall findings. Output only the report."
+)
+
+
+# Tracker calls may write to the database or Redis, so the async steps below make them through
+# asyncio.to_thread rather than blocking the event loop every concurrent claim is running on.
+@asynccontextmanager
+async def _stage(tracker: StageTracker, stage: str):
+    """Async counterpart of `tracker.stage`."""
+    await asyncio.to_thread(tracker.start, stage)
+    try:
+        yield tracker
+    finally:
+        await asyncio.to_thread(tracker.finish, stage)
+
+
+async def _extract_claims(client: LLMClient, text: str, tracker: StageTracker) -> list:
+    """Map-reduce extraction: claims are extracted from every chunk concurrently, then merged."""
+    chunks = chunk_text(text)
+    semaphore = asyncio.Semaphore(CLAIM_CONCURRENCY)
+    done = 0
+
+    async def extract(chunk: str) -> list:
+        nonlocal done
+        async with semaphore:
+            try:
+                reply = await client.acomplete(CLAIM_EXTRACTION_PROMPT, chunk, validate=_parse_claim_list)
+            except Exception as e:
+                if len(chunks) == 1:
+                    raise
+                logging.warning(f"Claim extraction failed for one of {len(chunks)} chunks: {e}")
+                return []
+        await asyncio.to_thread(tracker.record_message, "Claim_Extractor", reply)
+        done += 1
+        await asyncio.to_thread(tracker.update, "claim_extraction", done / len(chunks))
+        return _parse_claim_list(reply)
+
+    if len(chunks) > 1:
+        logging.info(f"Extracting claims from {len(chunks)} chunks of {len(text)} characters of text")
+    return merge_claims(await asyncio.gather(*(extract(chunk) for chunk in chunks)))
+
+
+def _parse_verdict(claim: str, reply: str) -> dict:
+    verdict = _parse_json_object(reply)
+    return {
+        "claim": claim,
+        "evidence_summary": str(verdict.get("evidence_summary", "")),
+        "score": float(verdict["score"]),
+    }
 
-    # Custom termination function
-    def is_termination_msg(message: dict) -> bool:
-        """Checks if the message indicates the end of the conversation."""
-        content = message.get("content", "")
-        if not content:
-            return False
-
-        # The conversation should terminate when the Verdict_Generator produces its final report.
-        # The report is a JSON object with specific keys. We check for the presence of these keys.
-        # We also need to handle cases where the JSON is embedded in a markdown block.
-        
-        # Extract JSON from markdown if present
-        if "```json" in content:
-            content_match = re.search(r"```json\s*(.*?)\s*```", content, re.DOTALL)
-            if content_match:
-                content = content_match.group(1)
 
-        try:
-            data = json.loads(content)
-            # Check for the structure of the final report
-            if isinstance(data, dict) and all(k in data for k in ['claims', 'report', 'overall_score']):
-                return True
-        except (json.JSONDecodeError, TypeError):
-            # Not a valid JSON or not a dictionary
-            pass
-            
-        return False
-
-    manager = autogen.GroupChatManager(
-        groupchat=groupchat,
-        llm_config=llm_config,
-        is_termination_msg=is_termination_msg,
+async def _verify_claim(client: LLMClient, claim: str) -> Tuple[dict, str, str]:
+    """Researches and judges one claim. Returns the verdict plus the search results and reply, for the log."""
+    evidence = await asyncio.to_thread(_search, claim)
+    reply = await client.acomplete(
+        CLAIM_VERIFICATION_PROMPT, f"Claim: {claim}\n\nSearch results:\n{evidence}",
+        validate=lambda reply: _parse_verdict(claim, reply),
     )
+    return _parse_verdict(claim, reply), evidence, reply
+
 
-    # Initiate the chat
-    user_proxy.initiate_chat(
-        manager,
-        message=f"Please analyze the following text, verify the claims, and provide a final report in the specified JSON format:\n\n{text}"
+def _fallback_report(verdicts: list, overall_score) -> str:
+    verified = [v for v in verdicts if v["score"] is not None]
+    if not verdicts:
+        return "No verifiable factual claims were found."
+    return (
+        f"{len(verified)} of {len(verdicts)} claims were checked"
+        + (f", with an average reliability of {overall_score:.0f}/100." if overall_score is not None else ".")
     )
 
-    # Extract and clean the final output
-    final_message = groupchat.messages[-1]['content']
 
-    # Remove Markdown code block markers if present
-    final_message = final_message.replace('```json', '').replace('```', '').strip()
+async def _analyze_claims(text: str, tracker: StageTracker) -> dict:
+    client = get_llm_client()
 
-    # Remove TERMINATE if present
-    final_message = final_message.replace('TERMINATE', '').strip()
+    # 1. Claim extraction over bounded chunks of the text
+    async with _stage(tracker, "claim_extraction"):
+        claims = (await _extract_claims(client, text, tracker))[:ANALYSIS_MAX_CLAIMS]
+        if claims:
+            await asyncio.to_thread(tracker.publish_claims, claims)
 
-    try:
-        return json.loads(final_message)
-    except json.JSONDecodeError as e:
-        # Try to extract JSON from malformed response
+    # 2. Research and verdict for every claim at once, bounded by the concurrency limit.
+    #    Claims verified recently, in this or another video, reuse that verdict.
+    store = get_claim_store() if CLAIM_CACHE_ENABLED and claims else None
+    known = [None] * len(claims)
+    if store is not None:
         try:
-            json_match = re.search(r'\{.*\}', final_message, re.DOTALL)
-            if json_match:
-                return json.loads(json_match.group())
-            else:
-                return {"error": "Could not extract valid JSON from response", "raw_response": final_message}
-        except:
-            return {"error": "Failed to parse JSON output", "details": str(e), "raw_response": final_message}
-
+            known = await asyncio.to_thread(store.lookup_many, claims)
+        except Exception as e:
+            logging.warning(f"Claim cache lookup failed, verifying every claim: {e}")
+    semaphore = asyncio.Semaphore(CLAIM_CONCURRENCY)
+    done = 0
+
+    async def verify(claim: str, cached: dict) -> dict:
+        nonlocal done
+        if cached is not None:
+            await asyncio.to_thread(tracker.record_message, "Knowledge_Seeker", f"{claim}\nReused the verdict for: {cached['matched_claim']} (similarity {cached['similarity']})")
+            verdict = {"claim": claim, "evidence_summary": cached["evidence_summary"], "score": cached["score"]}
+        else:
+            async with semaphore:
+                try:
+                    verdict, evidence, reply = await _verify_claim(client, claim)
+                    await asyncio.to_thread(tracker.record_message, "Knowledge_Seeker", f"{claim}\n{evidence}")
+                    await asyncio.to_thread(tracker.record_message, "Verdict_Generator", reply)
+                except Exception as e:
+                    logging.warning(f"Could not verify claim '{claim}': {e}")
+                    await asyncio.to_thread(tracker.record_message, "Verdict_Generator", f"Verification failed for '{claim}': {e}")
+                    verdict = {"claim": claim, "evidence_summary": f"Could not verify this claim: {e}", "score": None}
+        done += 1
+        await asyncio.to_thread(tracker.update, "research", done / len(claims))
+        return verdict
+
+    async with _stage(tracker, "research"):
+        verdicts = list(await asyncio.gather(*(verify(claim, cached) for claim, cached in zip(claims, known))))
+    if store is not None:
+        fresh = [verdict for verdict, cached in zip(verdicts, known) if cached is None]
+        try:
+            await asyncio.to_thread(store.save_many, fresh)
+        except Exception as e:
+            logging.warning(f"Could not store claim verdicts for reuse: {e}")
+
+    # 3. Aggregation: the score is computed, only the prose summary is left to the model
+    async with _stage(tracker, "verdict"):
+        scores = [v["score"] for v in verdicts if v["score"] is not None]
+        overall_score = round(sum(scores) / len(scores), 2) if scores else None
+        report = _fallback_report(verdicts, overall_score)
+        if scores:
+            try:
+                report = (await client.acomplete(REPORT_PROMPT, json.dumps(verdicts))).strip() or report
+                await asyncio.to_thread(tracker.record_message, "Verdict_Generator", report)
+            except Exception as e:
+                logging.warning(f"Could not generate the report summary, using the computed one: {e}")
+
+    return {"claims": verdicts, "report": report, "overall_score": overall_score}
+
+
+def run_analysis(text: str, tracker: StageTracker = None):
+    """
+    Analyzes the text in three steps: claim extraction over chunks of the text, concurrent
+    per-claim research and verdict, then aggregation. Returns {"claims", "report", "overall_score"}.
+    Stage progress, the extracted claims and the agent messages are reported to `tracker`.
+    """
+    tracker = tracker or StageTracker()
+    try:
+        return asyncio.run(_analyze_claims(text, tracker))
+    except Exception as e:
+        logging.error(f"Analysis failed: {e}", exc_info=True)
+        return {"error": f"Analysis failed: {e}"}
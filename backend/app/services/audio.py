@@ -0,0 +1,72 @@
+"""
+Audio decoding straight to in-memory PCM.
+
+The container's audio track is decoded once by ffmpeg into 16 kHz mono samples
+and handed to the ASR engine as a float32 NumPy array, the format Whisper works on
+internally. No intermediate audio file is written.
+"""
+import logging
+import subprocess
+import tempfile
+from typing import Iterator, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+BYTES_PER_SAMPLE = 2  # s16le
+
+
+def _ffmpeg_pcm_command(source: str, sample_rate: int, input_args: list = None) -> list:
+    return [
+        "ffmpeg", "-nostdin", "-loglevel", "error", "-threads", "0",
+        *(input_args or []), "-i", source,
+        "-vn", "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(sample_rate), "-",
+    ]
+
+
+def _to_float(pcm: bytes) -> np.ndarray:
+    return np.frombuffer(pcm, np.int16).astype(np.float32) / 32768.0
+
+
+def decode_audio(source: str, sample_rate: int = SAMPLE_RATE) -> Optional[np.ndarray]:
+    """
+    Decodes the audio track of a file (or URL) into a mono float32 array in [-1, 1].
+    Returns None if the source has no decodable audio.
+    """
+    process = subprocess.run(_ffmpeg_pcm_command(source, sample_rate), capture_output=True)
+    if process.returncode != 0:
+        logger.warning(f"ffmpeg could not decode audio from {source}: {process.stderr.decode(errors='ignore').strip()}")
+        return None
+    return _to_float(process.stdout)
+
+
+def iter_audio_chunks(source: str, chunk_seconds: float = 30.0, sample_rate: int = SAMPLE_RATE,
+                      input_args: list = None) -> Iterator[np.ndarray]:
+    """
+    Streams the audio track as consecutive float32 chunks of `chunk_seconds`
+    (the last one may be shorter) while ffmpeg is still decoding.
+    Raises RuntimeError if ffmpeg fails, e.g. when the stream breaks off mid-download.
+    """
+    chunk_bytes = int(chunk_seconds * sample_rate) * BYTES_PER_SAMPLE
+    # stderr goes to a file so a chatty ffmpeg can never block on a full pipe
+    with tempfile.TemporaryFile() as stderr:
+        process = subprocess.Popen(
+            _ffmpeg_pcm_command(source, sample_rate, input_args), stdout=subprocess.PIPE, stderr=stderr
+        )
+        try:
+            while True:
+                pcm = process.stdout.read(chunk_bytes)
+                if not pcm:
+                    break
+                yield _to_float(pcm[: len(pcm) - len(pcm) % BYTES_PER_SAMPLE])
+            if process.wait() != 0:
+                stderr.seek(0)
+                message = stderr.read().decode(errors="ignore").strip()
+                raise RuntimeError(f"ffmpeg exited with code {process.returncode} while decoding audio: {message}")
+        finally:
+            process.stdout.close()
+            if process.poll() is None:
+                process.kill()
+            process.wait()
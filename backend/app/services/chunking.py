@@ -0,0 +1,89 @@
+"""
+Transcript chunking for claim extraction.
+
+Long videos produce more text than fits comfortably in one prompt. The text is
+split into chunks of at most CLAIM_CHUNK_MAX_CHARS on sentence boundaries, never
+across a line break between sections (speech transcript, on-screen text lines),
+and each chunk repeats the last CLAIM_CHUNK_OVERLAP_SENTENCES sentences of the
+previous one so a claim spanning a boundary is still seen whole. Claims extracted
+from the chunks are then merged, dropping duplicates and near-duplicates; claims
+that differ in a negation or a number are never merged.
+"""
+import os
+import re
+from typing import Iterable, List
+
+from app.services.claim_text import claim_guards, normalize_claim
+
+CLAIM_CHUNK_MAX_CHARS = int(os.environ.get("CLAIM_CHUNK_MAX_CHARS", 6000))
+CLAIM_CHUNK_OVERLAP_SENTENCES = int(os.environ.get("CLAIM_CHUNK_OVERLAP_SENTENCES", 2))
+# Claims whose word sets overlap at least this much (Jaccard) are treated as the same claim
+CLAIM_MERGE_SIMILARITY = float(os.environ.get("CLAIM_MERGE_SIMILARITY", 0.8))
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def split_sentences(text: str) -> List[str]:
+    """Sentences of the text, with every line break also ending a sentence."""
+    sentences = []
+    for line in text.splitlines():
+        sentences.extend(sentence.strip() for sentence in _SENTENCE_END.split(line) if sentence.strip())
+    return sentences
+
+
+def _split_long(sentence: str, max_chars: int) -> List[str]:
+    # A single "sentence" longer than a chunk (e.g. unpunctuated speech) is cut between words
+    pieces, current = [], ""
+    for word in sentence.split():
+        if current and len(current) + 1 + len(word) > max_chars:
+            pieces.append(current)
+            current = word
+        else:
+            current = f"{current} {word}" if current else word
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def chunk_text(text: str, max_chars: int = CLAIM_CHUNK_MAX_CHARS, overlap: int = CLAIM_CHUNK_OVERLAP_SENTENCES) -> List[str]:
+    """Splits text into chunks of at most `max_chars`, overlapping by `overlap` sentences."""
+    if len(text) <= max_chars:
+        return [text] if text.strip() else []
+
+    sentences = [piece for sentence in split_sentences(text) for piece in _split_long(sentence, max_chars)]
+    chunks, current, size = [], [], 0
+    for sentence in sentences:
+        if current and size + 1 + len(sentence) > max_chars:
+            chunks.append(" ".join(current))
+            # Carry the overlap only if it leaves room for new text
+            current = current[-overlap:] if overlap else []
+            size = sum(len(s) + 1 for s in current)
+            while current and size + len(sentence) > max_chars:
+                size -= len(current.pop(0)) + 1
+        current.append(sentence)
+        size += len(sentence) + 1
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def _words(claim: str) -> set:
+    return set(normalize_claim(claim).split())
+
+
+def merge_claims(claim_lists: Iterable[List[str]], similarity: float = CLAIM_MERGE_SIMILARITY) -> List[str]:
+    """Merges per-chunk claim lists in order, keeping the first of any duplicate or near-duplicate claims."""
+    merged, seen = [], []
+    for claims in claim_lists:
+        for claim in claims:
+            words, guards = _words(claim), claim_guards(claim)
+            if not words:
+                continue
+            if any(
+                guards == other_guards and len(words & other) / len(words | other) >= similarity
+                for other, other_guards in seen
+            ):
+                continue
+            merged.append(claim)
+            seen.append((words, guards))
+    return merged
@@ -0,0 +1,278 @@
+"""
+Claim verification cache.
+
+The same claims come back across many different videos. Every verdict is stored
+in `verified_claims` under its normalized text, with an embedding of the claim,
+and a later analysis reuses a recent verdict for the same or a near-identical
+claim instead of searching and calling the model again.
+
+Exact matches on the normalized text are looked up in Postgres. Near matches use
+an in-process vector index over the stored embeddings, kept in sync with what
+other workers add. Embeddings come from a local CPU sentence-transformers model;
+without `sentence-transformers` installed only exact matches are reused. With
+`faiss` installed the index is a FAISS inner-product index, otherwise a numpy matrix.
+A near match is only reused if it is still fresh and has the same negations and
+numbers as the claim (see `claim_text.claim_guards`).
+
+Configuration (environment):
+    CLAIM_CACHE_ENABLED          "true" (default) or "false"
+    CLAIM_CACHE_MAX_AGE_DAYS     how long a verdict is reused (default 30)
+    CLAIM_SIMILARITY_THRESHOLD   cosine similarity from which two claims count as the same (default 0.92)
+    CLAIM_EMBEDDING_MODEL        sentence-transformers model (default "all-MiniLM-L6-v2")
+    CLAIM_INDEX_REFRESH_SECONDS  how often the index picks up verdicts from other workers (default 60)
+    CLAIM_SEARCH_CANDIDATES      nearest stored claims considered per claim (default 5)
+"""
+import importlib.util
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+
+from app.db.session import SessionLocal, VerifiedClaim
+from app.services.claim_text import claim_guards, normalize_claim
+from app.services.result_cache import PIPELINE_VERSION
+
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+logger = logging.getLogger(__name__)
+
+CLAIM_CACHE_ENABLED = os.environ.get("CLAIM_CACHE_ENABLED", "true").lower() == "true"
+CLAIM_CACHE_MAX_AGE_DAYS = float(os.environ.get("CLAIM_CACHE_MAX_AGE_DAYS", 30))
+CLAIM_SIMILARITY_THRESHOLD = float(os.environ.get("CLAIM_SIMILARITY_THRESHOLD", 0.92))
+CLAIM_EMBEDDING_MODEL = os.environ.get("CLAIM_EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+CLAIM_INDEX_REFRESH_SECONDS = float(os.environ.get("CLAIM_INDEX_REFRESH_SECONDS", 60))
+CLAIM_SEARCH_CANDIDATES = int(os.environ.get("CLAIM_SEARCH_CANDIDATES", 5))
+
+
+class ClaimIndex:
+    """Nearest-neighbour search over unit-length embeddings by inner product (cosine similarity)."""
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self.ids = []
+        self._faiss = faiss.IndexFlatIP(dim) if faiss is not None else None
+        self._matrix = np.empty((0, dim), dtype=np.float32)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, ids: List[int], vectors: np.ndarray):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        if self._faiss is not None:
+            self._faiss.add(vectors)
+        else:
+            self._matrix = np.vstack([self._matrix, vectors])
+        self.ids.extend(ids)
+
+    def search(self, vectors: np.ndarray, k: int = 1) -> List[List[tuple]]:
+        """Returns, for each query vector, up to `k` closest (id, similarity) pairs, closest first."""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        if not self.ids:
+            return [[] for _ in vectors]
+        k = min(k, len(self.ids))
+        if self._faiss is not None:
+            similarities, positions = self._faiss.search(vectors, k)
+        else:
+            all_similarities = vectors @ self._matrix.T
+            positions = np.argsort(-all_similarities, axis=1)[:, :k]
+            similarities = np.take_along_axis(all_similarities, positions, axis=1)
+        return [
+            [(self.ids[position], float(similarity)) for position, similarity in zip(row_positions, row_similarities) if position >= 0]
+            for row_positions, row_similarities in zip(positions, similarities)
+        ]
+
+
+class ClaimStore:
+    """Looks up and saves claim verdicts; one instance per process, safe to use from several threads."""
+
+    def __init__(self, model_name: str = CLAIM_EMBEDDING_MODEL, threshold: float = CLAIM_SIMILARITY_THRESHOLD):
+        self.model_name = model_name
+        self.threshold = threshold
+        self._model = None
+        self._index = None
+        self._indexed_ids = set()
+        self._last_id = 0
+        self._last_refresh = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def can_embed(self) -> bool:
+        # Imported only when first needed, so loading this module stays cheap for the API
+        return importlib.util.find_spec("sentence_transformers") is not None
+
+    def _embed(self, texts: List[str]) -> Optional[np.ndarray]:
+        if not self.can_embed or not texts:
+            return None
+        with self._lock:
+            if self._model is None:
+                from sentence_transformers import SentenceTransformer
+
+                start = time.perf_counter()
+                self._model = SentenceTransformer(self.model_name, device="cpu")
+                logger.info(f"Loaded claim embedding model '{self.model_name}' in {time.perf_counter() - start:.2f}s")
+        return self._model.encode(texts, normalize_embeddings=True, convert_to_numpy=True).astype(np.float32)
+
+    def _cutoff(self) -> datetime:
+        return datetime.utcnow() - timedelta(days=CLAIM_CACHE_MAX_AGE_DAYS)
+
+    def _refresh_index(self, db, dim: int):
+        """Adds the embeddings other workers stored since the last refresh."""
+        with self._lock:
+            if self._index is None:
+                self._index = ClaimIndex(dim)
+            if time.monotonic() - self._last_refresh < CLAIM_INDEX_REFRESH_SECONDS:
+                return
+            rows = (
+                db.query(VerifiedClaim.id, VerifiedClaim.embedding)
+                .filter(
+                    VerifiedClaim.id > self._last_id,
+                    VerifiedClaim.pipeline_version == PIPELINE_VERSION,
+                    VerifiedClaim.embedding_model == self.model_name,
+                    VerifiedClaim.verified_at >= self._cutoff(),
+                )
+                .order_by(VerifiedClaim.id)
+                .all()
+            )
+            self._add_to_index([row.id for row in rows], [np.frombuffer(row.embedding, dtype=np.float32) for row in rows])
+            if rows:
+                self._last_id = rows[-1].id
+            self._last_refresh = time.monotonic()
+
+    def _add_to_index(self, ids: List[int], vectors: list):
+        new = [(claim_id, vector) for claim_id, vector in zip(ids, vectors) if claim_id not in self._indexed_ids]
+        if new:
+            self._index.add([claim_id for claim_id, _ in new], np.stack([vector for _, vector in new]))
+            self._indexed_ids.update(claim_id for claim_id, _ in new)
+
+    def lookup_many(self, claims: List[str]) -> List[Optional[dict]]:
+        """
+        Returns, for each claim, a reusable verdict {"claim", "matched_claim", "evidence_summary", "score", "similarity"}
+        from a recent verification of the same or a near-identical claim, or None.
+        """
+        results = [None] * len(claims)
+        normalized = [normalize_claim(claim) for claim in claims]
+        db = SessionLocal()
+        try:
+            exact = {
+                row.normalized_text: row
+                for row in db.query(VerifiedClaim).filter(
+                    VerifiedClaim.normalized_text.in_(set(normalized)),
+                    VerifiedClaim.pipeline_version == PIPELINE_VERSION,
+                    VerifiedClaim.verified_at >= self._cutoff(),
+                )
+            }
+            for i, key in enumerate(normalized):
+                if key in exact:
+                    results[i] = self._verdict(claims[i], exact[key], 1.0)
+
+            missing = [i for i, result in enumerate(results) if result is None]
+            vectors = self._embed([normalized[i] for i in missing])
+            if vectors is None:
+                return results
+            self._refresh_index(db, vectors.shape[1])
+            with self._lock:
+                matches = self._index.search(vectors, CLAIM_SEARCH_CANDIDATES)
+            # Expired verdicts stay in the index, so a stale neighbour must not hide a fresh one behind it
+            candidates = {
+                i: [(claim_id, similarity) for claim_id, similarity in neighbours if similarity >= self.threshold]
+                for i, neighbours in zip(missing, matches)
+            }
+            candidate_ids = {claim_id for neighbours in candidates.values() for claim_id, _ in neighbours}
+            if candidate_ids:
+                rows = {
+                    row.id: row
+                    for row in db.query(VerifiedClaim).filter(
+                        VerifiedClaim.id.in_(candidate_ids),
+                        VerifiedClaim.verified_at >= self._cutoff(),
+                    )
+                }
+                for i, neighbours in candidates.items():
+                    guards = claim_guards(claims[i])
+                    for claim_id, similarity in neighbours:
+                        row = rows.get(claim_id)
+                        if row is not None and claim_guards(row.claim_text) == guards:
+                            results[i] = self._verdict(claims[i], row, similarity)
+                            break
+            return results
+        finally:
+            db.close()
+
+    @staticmethod
+    def _verdict(claim: str, row: VerifiedClaim, similarity: float) -> dict:
+        return {
+            "claim": claim,
+            "matched_claim": row.claim_text,
+            "evidence_summary": row.evidence_summary,
+            "score": row.score,
+            "similarity": round(similarity, 4),
+        }
+
+    def save_many(self, verdicts: List[dict]):
+        """Stores fresh verdicts ({"claim", "evidence_summary", "score"}) for later analyses to reuse."""
+        verdicts = [verdict for verdict in verdicts if verdict.get("score") is not None]
+        if not verdicts:
+            return
+        normalized = [normalize_claim(verdict["claim"]) for verdict in verdicts]
+        vectors = self._embed(normalized)
+        rows = [
+            {
+                "normalized_text": key,
+                "claim_text": verdict["claim"],
+                "evidence_summary": verdict.get("evidence_summary"),
+                "score": verdict["score"],
+                "embedding": vectors[i].tobytes() if vectors is not None else None,
+                "embedding_model": self.model_name if vectors is not None else None,
+                "pipeline_version": PIPELINE_VERSION,
+            }
+            # One row per normalized text, the last verdict wins
+            for i, (key, verdict) in enumerate(zip(normalized, verdicts))
+            if key not in normalized[i + 1:]
+        ]
+        stmt = insert(VerifiedClaim).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[VerifiedClaim.normalized_text, VerifiedClaim.pipeline_version],
+            set_={
+                "claim_text": stmt.excluded.claim_text,
+                "evidence_summary": stmt.excluded.evidence_summary,
+                "score": stmt.excluded.score,
+                "embedding": stmt.excluded.embedding,
+                "embedding_model": stmt.excluded.embedding_model,
+                "verified_at": func.now(),
+            },
+        ).returning(VerifiedClaim.id, VerifiedClaim.embedding)
+
+        db = SessionLocal()
+        try:
+            saved = db.execute(stmt).all()
+            db.commit()
+        finally:
+            db.close()
+        if vectors is not None:
+            with self._lock:
+                if self._index is None:
+                    self._index = ClaimIndex(vectors.shape[1])
+                self._add_to_index([row.id for row in saved], [np.frombuffer(row.embedding, dtype=np.float32) for row in saved])
+
+
+_store = None
+_store_pid = None
+_store_lock = threading.Lock()
+
+
+def get_claim_store() -> ClaimStore:
+    """Returns this process's claim store, creating it on first use (and again after a fork)."""
+    global _store, _store_pid
+    with _store_lock:
+        if _store is None or _store_pid != os.getpid():
+            _store = ClaimStore()
+            _store_pid = os.getpid()
+        return _store
@@ -0,0 +1,28 @@
+"""
+Claim text helpers shared by claim extraction and the claim verification cache.
+
+`normalize_claim` gives the form exact duplicates are matched on. `claim_guards`
+picks out the tokens that flip or change a claim while barely moving its wording
+(negations and numbers), so that "X causes Y" is never taken for "X does not
+cause Y", nor "5 mg" for "50 mg", however similar the two look otherwise.
+"""
+import re
+import unicodedata
+
+_NEGATION = re.compile(r"\b(?:not|no|never|none|nobody|nothing|neither|nor|cannot|without)\b|n['’]t\b")
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)*")
+
+
+def normalize_claim(text: str) -> str:
+    """Case-, punctuation- and whitespace-insensitive form of a claim, used for exact matches."""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    text = re.sub(r"[^\w\s]", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def claim_guards(text: str) -> tuple:
+    """The negations and numbers of a claim; claims whose guards differ are never the same claim."""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    negations = ["not"] * len(_NEGATION.findall(text))
+    numbers = sorted(number.replace(",", "") for number in _NUMBER.findall(text))
+    return tuple(negations + numbers)
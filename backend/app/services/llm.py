@@ -0,0 +1,223 @@
+"""
+Single-shot LLM calls for the analysis pipeline.
+
+Each pipeline step is one request with its own system prompt, rather than a turn
+in a multi-agent chat, so a step only pays for the context it actually needs.
+Calls go through autogen's OpenAIWrapper, which handles the Gemini API.
+
+Responses are cached in Redis, shared by every worker and kept across redeploys,
+keyed by model, messages and tools. Only replies the caller accepted are stored.
+Entries expire LLM_CACHE_TTL_SECONDS after their last use and the least recently
+used ones are evicted beyond LLM_CACHE_MAX_ENTRIES.
+
+Configuration (environment):
+    LLM_MODEL               model name (default "gemini-2.5-flash")
+    GEMINI_API_KEY          API key for the model
+    LLM_CACHE_BACKEND       "redis" (default) or "none"
+    LLM_CACHE_REDIS_URL     defaults to REDIS_URL
+    LLM_CACHE_TTL_SECONDS   default 7 days
+    LLM_CACHE_MAX_ENTRIES   default 50000
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+import autogen
+import redis
+
+logger = logging.getLogger(__name__)
+
+LLM_MODEL = os.environ.get("LLM_MODEL", "gemini-2.5-flash")
+LLM_CACHE_BACKEND = os.environ.get("LLM_CACHE_BACKEND", "redis")
+LLM_CACHE_REDIS_URL = os.environ.get("LLM_CACHE_REDIS_URL", os.environ.get("REDIS_URL", "redis://localhost:6379/0"))
+LLM_CACHE_TTL_SECONDS = int(os.environ.get("LLM_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+LLM_CACHE_MAX_ENTRIES = int(os.environ.get("LLM_CACHE_MAX_ENTRIES", 50000))
+
+
+def default_config_list() -> list:
+    return [
+        {
+            "model": LLM_MODEL,
+            "api_key": os.environ.get("GEMINI_API_KEY", "abc"),
+            "api_type": "google",
+        }
+    ]
+
+
+def cache_key(model: str, messages: list, tools: list = None) -> str:
+    payload = json.dumps({"model": model, "messages": messages, "tools": tools}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class LLMCache:
+    """Response cache interface; this base class caches nothing."""
+
+    def get(self, key: str):
+        return None
+
+    def set(self, key: str, value: str):
+        pass
+
+    def stats(self) -> dict:
+        return {}
+
+
+class RedisLLMCache(LLMCache):
+    """
+    Stores responses under `llm:<key>` with a TTL that every hit renews. A sorted set of keys
+    by last use drives size-based eviction and is pruned of keys that expired; hit/miss
+    counters are kept in Redis so they cover every worker. Redis errors are logged and
+    treated as misses.
+    """
+    prefix = "llm:"
+    index_key = "llm_cache:index"
+    stats_key = "llm_cache:stats"
+
+    def __init__(self, url: str = LLM_CACHE_REDIS_URL, ttl: int = LLM_CACHE_TTL_SECONDS, max_entries: int = LLM_CACHE_MAX_ENTRIES):
+        self.url = url
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._redis = None
+        self._redis_pid = None
+        self._lock = threading.Lock()
+
+    def _client(self) -> redis.Redis:
+        with self._lock:
+            if self._redis is None or self._redis_pid != os.getpid():
+                self._redis = redis.Redis.from_url(self.url, decode_responses=True)
+                self._redis_pid = os.getpid()
+            return self._redis
+
+    def get(self, key: str):
+        try:
+            client = self._client()
+            value = client.get(self.prefix + key)
+            pipe = client.pipeline(transaction=False)
+            pipe.hincrby(self.stats_key, "hits" if value is not None else "misses", 1)
+            if value is not None:
+                pipe.expire(self.prefix + key, self.ttl)
+                pipe.zadd(self.index_key, {key: time.time()})
+            pipe.execute()
+            return value
+        except Exception as e:
+            logger.warning(f"LLM cache read failed: {e}")
+            return None
+
+    def _prune(self, pipe, now: float):
+        # Keys not used within the TTL have expired; drop them from the index as well
+        pipe.zremrangebyscore(self.index_key, "-inf", now - self.ttl)
+
+    def set(self, key: str, value: str):
+        try:
+            client = self._client()
+            now = time.time()
+            pipe = client.pipeline(transaction=False)
+            pipe.set(self.prefix + key, value, ex=self.ttl)
+            pipe.zadd(self.index_key, {key: now})
+            self._prune(pipe, now)
+            pipe.zcard(self.index_key)
+            size = pipe.execute()[-1]
+            if size > self.max_entries:
+                evicted = [member for member, _ in client.zpopmin(self.index_key, size - self.max_entries)]
+                if evicted:
+                    client.delete(*(self.prefix + member for member in evicted))
+                    client.hincrby(self.stats_key, "evictions", len(evicted))
+        except Exception as e:
+            logger.warning(f"LLM cache write failed: {e}")
+
+    def stats(self) -> dict:
+        client = self._client()
+        pipe = client.pipeline(transaction=False)
+        self._prune(pipe, time.time())
+        pipe.zcard(self.index_key)
+        pipe.hgetall(self.stats_key)
+        entries, raw_counters = pipe.execute()[-2:]
+        counters = {name: int(value) for name, value in raw_counters.items()}
+        hits, misses = counters.get("hits", 0), counters.get("misses", 0)
+        return {
+            **counters,
+            "entries": entries,
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+        }
+
+
+CACHE_BACKENDS = {
+    "redis": RedisLLMCache,
+    "none": LLMCache,
+}
+
+
+class LLMClient:
+    """A chat-completion client; `complete` is blocking, `acomplete` runs it off the event loop."""
+
+    def __init__(self, config_list: list = None, cache: LLMCache = None):
+        self.config_list = config_list or default_config_list()
+        self.cache = cache if cache is not None else LLMCache()
+        # autogen's own disk cache is per container; responses are cached in `self.cache` instead
+        self._client = autogen.OpenAIWrapper(config_list=self.config_list, cache_seed=None)
+
+    def complete(self, system: str, prompt: str, tools: list = None, validate=None) -> str:
+        """
+        Returns the model's reply. `validate`, if given, is called with a fresh reply and should raise
+        if it is unusable; such a reply is raised to the caller instead of being cached.
+        """
+        messages = [
+            {"role": "system", "content": system},
+            {"role": "user", "content": prompt},
+        ]
+        key = cache_key(self.config_list[0]["model"], messages, tools)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        start = time.perf_counter()
+        response = self._client.create(messages=messages, **({"tools": tools} if tools else {}))
+        content = self._client.extract_text_or_completion_object(response)[0]
+        usage = getattr(response, "usage", None)
+        logger.info(
+            f"LLM call took {time.perf_counter() - start:.2f}s"
+            + (f" ({usage.prompt_tokens} prompt + {usage.completion_tokens} completion tokens)" if usage else "")
+        )
+        content = content if isinstance(content, str) else str(content)
+        if validate is not None:
+            validate(content)
+        if content:
+            self.cache.set(key, content)
+        return content
+
+    async def acomplete(self, system: str, prompt: str, tools: list = None, validate=None) -> str:
+        return await asyncio.to_thread(self.complete, system, prompt, tools, validate)
+
+
+_cache = None
+_cache_pid = None
+_client = None
+_client_pid = None
+_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMCache:
+    """Returns this process's response cache, creating it on first use (and again after a fork)."""
+    global _cache, _cache_pid
+    with _lock:
+        if _cache is None or _cache_pid != os.getpid():
+            if LLM_CACHE_BACKEND not in CACHE_BACKENDS:
+                raise ValueError(f"Unknown LLM_CACHE_BACKEND '{LLM_CACHE_BACKEND}', expected one of {sorted(CACHE_BACKENDS)}")
+            _cache = CACHE_BACKENDS[LLM_CACHE_BACKEND]()
+            _cache_pid = os.getpid()
+        return _cache
+
+
+def get_llm_client() -> LLMClient:
+    """Returns this process's client, creating it on first use (and again after a fork)."""
+    global _client, _client_pid
+    cache = get_llm_cache()
+    with _lock:
+        if _client is None or _client_pid != os.getpid():
+            _client = LLMClient(cache=cache)
+            _client_pid = os.getpid()
+        return _client
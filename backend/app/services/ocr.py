@@ -0,0 +1,161 @@
+"""
+OCR engine.
+
+Only the parts of a frame that look like text are recognized: text lines are
+located with MSER (falling back to the caption band), cropped, converted to
+binarized grayscale and recognized in batches on a persistent per-process pool.
+
+With `tesserocr` installed each pool thread keeps its own Tesseract API handle,
+so there is no process spawn per image. Without it, each batch is written as one
+multi-page TIFF and recognized by a single tesseract invocation.
+
+Configuration (environment):
+    OCR_WORKERS     recognition threads per process (default 2)
+    OCR_BATCH_SIZE  crops per batch (default 16)
+    OCR_LANG        Tesseract language (default "eng")
+"""
+import logging
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+import cv2
+import numpy as np
+import pytesseract
+
+from app.services.frame_sampling import caption_band
+
+try:
+    import tesserocr
+    from PIL import Image
+except ImportError:
+    tesserocr = None
+
+logger = logging.getLogger(__name__)
+
+OCR_WORKERS = int(os.environ.get("OCR_WORKERS", 2))
+OCR_BATCH_SIZE = int(os.environ.get("OCR_BATCH_SIZE", 16))
+OCR_LANG = os.environ.get("OCR_LANG", "eng")
+OCR_MAX_REGIONS = 6
+# Tesseract is most accurate with text around 30px high
+MIN_TEXT_HEIGHT = 32
+
+
+def find_text_regions(gray: np.ndarray) -> List[np.ndarray]:
+    """Returns crops of likely text lines, top to bottom; the caption band if none are found."""
+    height, width = gray.shape[:2]
+    mser = cv2.MSER_create()
+    mser.setMinArea(30)
+    mser.setMaxArea(max(60, int(0.02 * height * width)))
+    _, boxes = mser.detectRegions(gray)
+
+    mask = np.zeros_like(gray)
+    for x, y, w, h in boxes:
+        # Character-sized blobs only
+        if h < 0.2 * height and w < 0.3 * width:
+            mask[y:y + h, x:x + w] = 255
+    # Join characters into lines
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (max(15, width // 30), 3))
+    mask = cv2.dilate(mask, kernel)
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    rects = [cv2.boundingRect(c) for c in contours]
+    rects = [r for r in rects if r[2] >= 2 * r[3] and r[3] >= 8]
+    rects = sorted(rects, key=lambda r: r[2] * r[3], reverse=True)[:OCR_MAX_REGIONS]
+    if not rects:
+        return [caption_band(gray)]
+
+    pad = 4
+    return [
+        gray[max(0, y - pad):min(height, y + h + pad), max(0, x - pad):min(width, x + w + pad)]
+        for x, y, w, h in sorted(rects, key=lambda r: (r[1], r[0]))
+    ]
+
+
+def preprocess(crop: np.ndarray) -> np.ndarray:
+    """Upscales small text and binarizes it to dark text on a light background."""
+    if crop.ndim == 3:
+        crop = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+    if 0 < crop.shape[0] < MIN_TEXT_HEIGHT:
+        scale = min(4.0, MIN_TEXT_HEIGHT / crop.shape[0])
+        crop = cv2.resize(crop, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
+    _, binary = cv2.threshold(crop, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    if binary.mean() < 127:
+        binary = 255 - binary
+    return cv2.copyMakeBorder(binary, 10, 10, 10, 10, cv2.BORDER_CONSTANT, value=255)
+
+
+def prepare_frame(frame: np.ndarray) -> List[np.ndarray]:
+    """Turns a video frame into the preprocessed crops that should be recognized."""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    return [preprocess(region) for region in find_text_regions(gray) if region.size]
+
+
+class OCREngine:
+    """Recognizes batches of preprocessed images on a persistent thread pool."""
+
+    def __init__(self, workers: int = OCR_WORKERS, batch_size: int = OCR_BATCH_SIZE, lang: str = OCR_LANG):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.lang = lang
+        self.backend = "tesserocr" if tesserocr is not None else "tesseract-batch"
+        self._local = threading.local()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ocr")
+
+    def _tesserocr_api(self):
+        api = getattr(self._local, "api", None)
+        if api is None:
+            # PSM 6: a single uniform block of text, which is what a cropped line group is
+            api = tesserocr.PyTessBaseAPI(lang=self.lang, psm=tesserocr.PSM.SINGLE_BLOCK)
+            self._local.api = api
+        return api
+
+    def _recognize_tesserocr(self, images):
+        api = self._tesserocr_api()
+        texts = []
+        for image in images:
+            api.SetImage(Image.fromarray(image))
+            texts.append(api.GetUTF8Text())
+        return texts
+
+    def _recognize_tiff(self, images):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "batch.tif")
+            cv2.imwritemulti(path, images)
+            output = pytesseract.image_to_string(path, lang=self.lang, config="--psm 6")
+        # Tesseract separates pages with a form feed
+        pages = output.split("\f")
+        return (pages + [""] * len(images))[:len(images)]
+
+    def recognize(self, images: List[np.ndarray]) -> List[str]:
+        """Returns the recognized text of each image, in order."""
+        if not images:
+            return []
+        start = time.perf_counter()
+        recognize_batch = self._recognize_tesserocr if tesserocr is not None else self._recognize_tiff
+        batches = [images[i:i + self.batch_size] for i in range(0, len(images), self.batch_size)]
+        texts = [text for batch_texts in self._pool.map(recognize_batch, batches) for text in batch_texts]
+        elapsed = max(time.perf_counter() - start, 1e-6)
+        logger.info(
+            f"OCR ({self.backend}): {len(images)} crops in {elapsed:.2f}s, "
+            f"{len(images) / elapsed / min(self.workers, len(batches)):.1f} crops/s per core"
+        )
+        return texts
+
+
+_engine = None
+_engine_pid = None
+_engine_lock = threading.Lock()
+
+
+def get_ocr_engine() -> OCREngine:
+    """Returns this process's OCR engine, creating it on first use (and again after a fork)."""
+    global _engine, _engine_pid
+    with _engine_lock:
+        if _engine is None or _engine_pid != os.getpid():
+            _engine = OCREngine()
+            _engine_pid = os.getpid()
+        return _engine
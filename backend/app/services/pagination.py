@@ -0,0 +1,25 @@
+"""
+Keyset (cursor) pagination.
+
+A cursor is the sort key of the last row of a page, `(created_at, id)`, encoded
+as an opaque URL-safe string. The next page continues strictly after it, so its
+cost does not grow with how deep the client has paged, unlike OFFSET.
+"""
+import base64
+from datetime import datetime
+from typing import Tuple
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Returns the `(created_at, id)` pair of a cursor. Raises ValueError if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, row_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
@@ -0,0 +1,97 @@
+"""
+Per-stage progress tracking for the analysis pipeline.
+
+The pipeline reports which stage it is in and how far along each stage is; the
+tracker turns that into an overall progress fraction and a compact
+`{stage: seconds}` timing map. The base tracker only records; the worker
+subclasses it to persist and publish updates while the job runs.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+# Pipeline stages in order, with their share of the overall progress bar.
+# ASR and OCR run concurrently, so progress is a weighted sum rather than a position.
+STAGE_WEIGHTS = {
+    "metadata": 0.03,
+    "download": 0.12,
+    "audio": 0.05,
+    "asr": 0.20,
+    "ocr": 0.10,
+    "claim_extraction": 0.10,
+    "research": 0.30,
+    "verdict": 0.10,
+}
+
+
+class StageTracker:
+    """Records stage durations and completion fractions. Safe to use from several threads."""
+
+    def __init__(self, media_duration: float = None):
+        # Length of the video in seconds, when known, so ASR and OCR can report a fraction
+        self.media_duration = media_duration
+        self.timings = {}
+        self.fractions = {}
+        self.current_stage = None
+        # Agent conversation, as (agent_name, message) pairs, kept in memory until the job saves it
+        self.messages = []
+        self._started = {}
+        self._lock = threading.RLock()
+
+    @property
+    def progress(self) -> float:
+        with self._lock:
+            total = sum(STAGE_WEIGHTS.get(stage, 0.0) * fraction for stage, fraction in self.fractions.items())
+        return round(min(total, 1.0), 4)
+
+    def start(self, stage: str):
+        with self._lock:
+            self._started[stage] = time.perf_counter()
+            self.fractions.setdefault(stage, 0.0)
+            self.current_stage = stage
+        self._on_change(force=True)
+
+    def update(self, stage: str, fraction: float):
+        with self._lock:
+            self.fractions[stage] = max(self.fractions.get(stage, 0.0), min(fraction, 1.0))
+        self._on_change(force=False)
+
+    def finish(self, stage: str):
+        with self._lock:
+            started = self._started.pop(stage, None)
+            if started is not None:
+                self.timings[stage] = round(time.perf_counter() - started, 2)
+            self.fractions[stage] = 1.0
+        self._on_change(force=True)
+
+    def skip(self, stage: str):
+        """Marks a stage that does not apply to this job (e.g. OCR when disabled) as done."""
+        with self._lock:
+            self.fractions[stage] = 1.0
+
+    @contextmanager
+    def stage(self, stage: str):
+        self.start(stage)
+        try:
+            yield self
+        finally:
+            self.finish(stage)
+
+    def media_progress(self, stage: str, position_seconds: float):
+        """Reports progress through the media timeline, if the media duration is known."""
+        if self.media_duration:
+            self.update(stage, position_seconds / self.media_duration)
+
+    def publish(self, **fields):
+        """Makes a partial result (e.g. the transcript) available before the job ends."""
+
+    def publish_claims(self, claims: list):
+        """Makes the extracted claims available before they have been verified."""
+
+    def record_message(self, agent_name: str, message: str):
+        """Keeps one message of the agent conversation for the job's log."""
+        with self._lock:
+            self.messages.append((agent_name, message))
+
+    def _on_change(self, force: bool):
+        """Called after every change; `force` marks stage boundaries."""
@@ -0,0 +1,166 @@
+"""
+Analysis result cache.
+
+A video only needs to go through download, transcription, OCR and the agent
+analysis once per pipeline version. New requests for the same video either reuse
+a recent completed analysis or attach to the one that is already running; the
+worker additionally reuses results for identical extracted text (re-uploads of
+the same content under a different URL).
+"""
+import hashlib
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import func, insert, literal, select, text
+from sqlalchemy.orm import Session
+
+from app.db.session import AnalysisResult, Claim
+from app.services import user_stats
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever a change to extraction or analysis should invalidate cached results.
+PIPELINE_VERSION = os.environ.get("PIPELINE_VERSION", "1")
+
+# Completed analyses older than this are considered stale and re-run. 0 disables reuse.
+ANALYSIS_CACHE_TTL_SECONDS = int(os.environ.get("ANALYSIS_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+
+# Running analyses with no activity for this long are assumed dead (e.g. their worker was killed)
+# and are failed, together with the requests attached to them.
+ANALYSIS_INFLIGHT_TIMEOUT_SECONDS = int(os.environ.get("ANALYSIS_INFLIGHT_TIMEOUT_SECONDS", 3600))
+
+IN_FLIGHT_STATUSES = ("starting", "processing")
+
+
+def content_hash(extracted_text: str) -> str:
+    """Hashes the extracted text so identical content can be matched across URLs."""
+    normalized = " ".join(extracted_text.split()).lower()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def lock_video(db: Session, video_id: int):
+    """Serializes cache decisions for one video until the current transaction ends."""
+    if db.bind.dialect.name == "postgresql":
+        db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": video_id})
+
+
+def _fresh_completed(db: Session):
+    query = db.query(AnalysisResult).filter(
+        AnalysisResult.status == "completed",
+        AnalysisResult.pipeline_version == PIPELINE_VERSION,
+    )
+    if ANALYSIS_CACHE_TTL_SECONDS > 0:
+        cutoff = datetime.utcnow() - timedelta(seconds=ANALYSIS_CACHE_TTL_SECONDS)
+        query = query.filter(AnalysisResult.completed_at >= cutoff)
+    return query
+
+
+def find_completed_analysis(db: Session, video_id: int) -> Optional[AnalysisResult]:
+    """Returns the most recent fresh completed analysis of a video, if any."""
+    if ANALYSIS_CACHE_TTL_SECONDS <= 0:
+        return None
+    return (
+        _fresh_completed(db)
+        .filter(AnalysisResult.video_id == video_id)
+        .order_by(AnalysisResult.completed_at.desc())
+        .first()
+    )
+
+
+def find_completed_by_content(db: Session, extracted_hash: str, exclude_id: int) -> Optional[AnalysisResult]:
+    """Returns a fresh completed analysis whose extracted text hashed to the same value."""
+    if ANALYSIS_CACHE_TTL_SECONDS <= 0:
+        return None
+    return (
+        _fresh_completed(db)
+        .filter(AnalysisResult.content_hash == extracted_hash, AnalysisResult.id != exclude_id)
+        .order_by(AnalysisResult.completed_at.desc())
+        .first()
+    )
+
+
+def _in_flight(db: Session, video_id: int):
+    return db.query(AnalysisResult).filter(
+        AnalysisResult.video_id == video_id,
+        AnalysisResult.status.in_(IN_FLIGHT_STATUSES),
+        AnalysisResult.source_analysis_id.is_(None),
+    )
+
+
+def fail_stale_analyses(db: Session, video_id: int):
+    """Fails running analyses of a video whose worker has gone quiet, and every request attached to them."""
+    cutoff = datetime.utcnow() - timedelta(seconds=ANALYSIS_INFLIGHT_TIMEOUT_SECONDS)
+    last_activity = func.coalesce(AnalysisResult.updated_at, AnalysisResult.created_at)
+    for analysis in _in_flight(db, video_id).filter(last_activity < cutoff).all():
+        error_message = f"Analysis stopped responding after {ANALYSIS_INFLIGHT_TIMEOUT_SECONDS}s without progress."
+        logger.warning(f"Failing stale analysis {analysis.id} of video {video_id}")
+        fail_followers(db, analysis, error_message)
+        previous_status = analysis.status
+        analysis.status = "failed"
+        analysis.error_message = error_message
+        user_stats.record_finished(db, analysis, previous_status)
+
+
+def find_in_flight_analysis(db: Session, video_id: int) -> Optional[AnalysisResult]:
+    """Returns the analysis currently running for a video, if any, after failing stale ones."""
+    fail_stale_analyses(db, video_id)
+    return (
+        _in_flight(db, video_id)
+        .filter(AnalysisResult.pipeline_version == PIPELINE_VERSION)
+        .order_by(AnalysisResult.created_at.desc())
+        .first()
+    )
+
+
+def copy_results(db: Session, source: AnalysisResult, target: AnalysisResult):
+    """Copies a completed analysis (report, score and claims) onto another row."""
+    previous_status = target.status
+    target.raw_text_extracted = source.raw_text_extracted
+    target.factual_report_json = source.factual_report_json
+    target.reliability_score = source.reliability_score
+    target.domain_inferred = source.domain_inferred
+    target.content_hash = source.content_hash
+    target.pipeline_version = source.pipeline_version
+    target.error_message = None
+    target.status = "completed"
+    target.progress = 1.0
+    target.completed_at = datetime.utcnow()
+
+    db.query(Claim).filter(Claim.analysis_result_id == target.id).delete()
+    # Copied inside the database, in one statement, without loading the claims
+    copied = db.execute(insert(Claim).from_select(
+        ["claim_text", "evidence_summary", "score", "analysis_result_id"],
+        select(Claim.claim_text, Claim.evidence_summary, Claim.score, literal(target.id))
+        .where(Claim.analysis_result_id == source.id)
+        .order_by(Claim.id),
+    ))
+    user_stats.record_finished(db, target, previous_status, claim_count=copied.rowcount)
+
+
+def _followers(db: Session, source: AnalysisResult):
+    return (
+        db.query(AnalysisResult)
+        .filter(
+            AnalysisResult.source_analysis_id == source.id,
+            AnalysisResult.status.in_(IN_FLIGHT_STATUSES),
+        )
+        .all()
+    )
+
+
+def complete_followers(db: Session, source: AnalysisResult):
+    """Hands a finished analysis to every request that attached to it while it was running."""
+    for follower in _followers(db, source):
+        copy_results(db, source, follower)
+        logger.info(f"Analysis {follower.id} completed from in-flight analysis {source.id}")
+
+
+def fail_followers(db: Session, source: AnalysisResult, error_message: str):
+    """Fails every request that attached to an analysis which failed."""
+    for follower in _followers(db, source):
+        previous_status = follower.status
+        follower.status = "failed"
+        follower.error_message = error_message
+        user_stats.record_finished(db, follower, previous_status)
@@ -0,0 +1,280 @@
+"""
+Web search for claim research.
+
+Every query goes through one client per process that:
+  - caches results in Redis by normalized query, so repeated claims cost no quota;
+  - coalesces identical concurrent queries into one backend request, between threads
+    of a process and, through a short Redis lock, between workers;
+  - spends from a token bucket shared by every worker in Redis, so a burst of
+    analyses waits for quota instead of failing on the provider's rate limit.
+
+Redis problems are logged and degrade to uncached, unlimited searches.
+
+Configuration (environment):
+    SEARCH_BACKEND            "google" (Custom Search JSON API, default) or "stub" (offline canned results)
+    GOOGLE_API_KEY            API key for the Custom Search JSON API
+    GOOGLE_CSE_ID             Programmable Search Engine ID
+    SEARCH_RESULTS            results per query (default 3)
+    SEARCH_CACHE_TTL_SECONDS  how long results are reused (default 1 day)
+    SEARCH_RATE_PER_SECOND    sustained queries per second across all workers (default 1)
+    SEARCH_RATE_BURST         bucket size (default 5)
+    SEARCH_REDIS_URL          defaults to REDIS_URL
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from typing import List
+
+import redis
+
+logger = logging.getLogger(__name__)
+
+SEARCH_BACKEND = os.environ.get("SEARCH_BACKEND", "google")
+SEARCH_RESULTS = int(os.environ.get("SEARCH_RESULTS", 3))
+SEARCH_CACHE_TTL_SECONDS = int(os.environ.get("SEARCH_CACHE_TTL_SECONDS", 24 * 3600))
+SEARCH_RATE_PER_SECOND = float(os.environ.get("SEARCH_RATE_PER_SECOND", 1))
+SEARCH_RATE_BURST = int(os.environ.get("SEARCH_RATE_BURST", 5))
+SEARCH_REDIS_URL = os.environ.get("SEARCH_REDIS_URL", os.environ.get("REDIS_URL", "redis://localhost:6379/0"))
+
+# Lifetime of the lock a worker holds while running a query others wait on. The owner renews it
+# while it waits for rate-limit quota, so it only lapses if the owner stops (e.g. is killed).
+COALESCE_WAIT_SECONDS = 10
+
+# Takes one token if available; otherwise returns how many milliseconds until one is
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or burst
+local updated = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + (now - updated) * rate / 1000)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = math.ceil((1 - tokens) * 1000 / rate)
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst * 1000 / rate) + 1000)
+return wait
+"""
+
+# The coalescing lock holds a per-owner token, so an owner never renews or releases another owner's lock
+EXTEND_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def normalize_query(query: str) -> str:
+    return re.sub(r"\s+", " ", query.casefold()).strip()
+
+
+def format_results(results: List[dict]) -> str:
+    """Renders results as the plain-text block the research prompt expects."""
+    if not results:
+        return "No search results found."
+    lines = []
+    for i, result in enumerate(results):
+        lines.append(f"Result {i + 1}:")
+        lines.append(f"  Title: {result.get('title', 'N/A')}")
+        lines.append(f"  Link: {result.get('link', 'N/A')}")
+        lines.append(f"  Snippet: {result.get('snippet', 'N/A')}")
+    return "\n".join(lines)
+
+
+class GoogleSearchBackend:
+    """Google Custom Search JSON API."""
+    name = "google"
+
+    def __init__(self):
+        from googleapiclient.discovery import build
+
+        self._service = build("customsearch", "v1", developerKey=os.environ.get("GOOGLE_API_KEY"), cache_discovery=False)
+        self._cse_id = os.environ.get("GOOGLE_CSE_ID")
+        self._lock = threading.Lock() # googleapiclient's HTTP transport is not thread-safe
+
+    def search(self, query: str, num: int) -> List[dict]:
+        with self._lock:
+            response = self._service.cse().list(q=query, cx=self._cse_id, num=num).execute()
+        return [
+            {"title": item.get("title"), "link": item.get("link"), "snippet": item.get("snippet")}
+            for item in response.get("items", [])
+        ]
+
+
+class StubSearchBackend:
+    """Deterministic canned results, for running the pipeline offline."""
+    name = "stub"
+
+    def search(self, query: str, num: int) -> List[dict]:
+        slug = re.sub(r"\W+", "-", normalize_query(query)).strip("-")[:60]
+        return [
+            {
+                "title": f"Stub result {i + 1} for: {query}",
+                "link": f"https://example.com/{slug}/{i + 1}",
+                "snippet": f"Offline stub snippet {i + 1} about '{query}'.",
+            }
+            for i in range(num)
+        ]
+
+
+BACKENDS = {
+    GoogleSearchBackend.name: GoogleSearchBackend,
+    StubSearchBackend.name: StubSearchBackend,
+}
+
+
+class SearchClient:
+    def __init__(self, backend, redis_url: str = SEARCH_REDIS_URL, ttl: int = SEARCH_CACHE_TTL_SECONDS,
+                 rate_per_second: float = SEARCH_RATE_PER_SECOND, burst: int = SEARCH_RATE_BURST):
+        self.backend = backend
+        self.ttl = ttl
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self._redis = redis.Redis.from_url(redis_url, decode_responses=True) if redis_url else None
+        self._in_flight = {}
+        self._in_flight_lock = threading.Lock()
+
+    def _key(self, query: str, num: int) -> str:
+        digest = hashlib.sha256(f"{self.backend.name}|{num}|{normalize_query(query)}".encode()).hexdigest()
+        return f"search:{digest}"
+
+    def _cached(self, key: str):
+        if self._redis is None:
+            return None
+        try:
+            cached = self._redis.get(key)
+            return json.loads(cached) if cached is not None else None
+        except Exception as e:
+            logger.warning(f"Search cache read failed: {e}")
+            return None
+
+    def _extend_lock(self, lock_key: str, lock_token: str):
+        try:
+            self._redis.eval(EXTEND_LOCK_SCRIPT, 1, lock_key, lock_token, COALESCE_WAIT_SECONDS * 1000)
+        except Exception as e:
+            logger.warning(f"Could not renew search lock: {e}")
+
+    def _release_lock(self, lock_key: str, lock_token: str):
+        try:
+            self._redis.eval(RELEASE_LOCK_SCRIPT, 1, lock_key, lock_token)
+        except Exception as e:
+            logger.warning(f"Could not release search lock: {e}")
+
+    def _acquire_token(self, on_wait=None):
+        """Blocks until the shared bucket grants a query, calling `on_wait` before every wait."""
+        if self._redis is None or self.rate_per_second <= 0:
+            return
+        while True:
+            try:
+                wait_ms = self._redis.eval(
+                    TOKEN_BUCKET_SCRIPT, 1, f"search:bucket:{self.backend.name}",
+                    self.rate_per_second, self.burst, int(time.time() * 1000),
+                )
+            except Exception as e:
+                logger.warning(f"Search rate limiter unavailable, not limiting: {e}")
+                return
+            if not wait_ms:
+                return
+            if on_wait is not None:
+                on_wait()
+            time.sleep(wait_ms / 1000)
+
+    def _fetch(self, key: str, query: str, num: int) -> List[dict]:
+        # Another worker may already be running this query; wait for its result while it holds the lock
+        lock_key = f"{key}:lock"
+        lock_token = None
+        if self._redis is not None:
+            try:
+                token = uuid.uuid4().hex
+                if self._redis.set(lock_key, token, nx=True, ex=COALESCE_WAIT_SECONDS):
+                    lock_token = token
+                else:
+                    # A live owner keeps renewing the lock; a dead one's lock expires within COALESCE_WAIT_SECONDS
+                    while self._redis.exists(lock_key):
+                        time.sleep(0.2)
+                    cached = self._cached(key)
+                    if cached is not None:
+                        return cached
+            except Exception as e:
+                logger.warning(f"Search coalescing unavailable: {e}")
+
+        try:
+            if lock_token is not None:
+                self._acquire_token(on_wait=lambda: self._extend_lock(lock_key, lock_token))
+                self._extend_lock(lock_key, lock_token)
+            else:
+                self._acquire_token()
+            start = time.perf_counter()
+            results = self.backend.search(query, num)
+            logger.info(f"Search '{query}' returned {len(results)} results in {time.perf_counter() - start:.2f}s")
+            if self._redis is not None:
+                try:
+                    self._redis.set(key, json.dumps(results), ex=self.ttl)
+                except Exception as e:
+                    logger.warning(f"Search cache write failed: {e}")
+            return results
+        finally:
+            if lock_token is not None:
+                self._release_lock(lock_key, lock_token)
+
+    def search(self, query: str, num: int = SEARCH_RESULTS) -> List[dict]:
+        key = self._key(query, num)
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+
+        # Threads asking for the same query share one request
+        with self._in_flight_lock:
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._in_flight[key] = future
+        if not owner:
+            return future.result()
+
+        try:
+            results = self._fetch(key, query, num)
+            future.set_result(results)
+            return results
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._in_flight_lock:
+                self._in_flight.pop(key, None)
+
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def get_search_client() -> SearchClient:
+    """Returns this process's client, creating it on first use (and again after a fork)."""
+    global _client, _client_pid
+    with _client_lock:
+        if _client is None or _client_pid != os.getpid():
+            if SEARCH_BACKEND not in BACKENDS:
+                raise ValueError(f"Unknown SEARCH_BACKEND '{SEARCH_BACKEND}', expected one of {sorted(BACKENDS)}")
+            _client = SearchClient(BACKENDS[SEARCH_BACKEND]())
+            _client_pid = os.getpid()
+        return _client
@@ -0,0 +1,123 @@
+"""
+Analysis status events over Redis pub/sub.
+
+Workers publish what changed about an analysis (status, stage, progress, partial
+results) to one channel per task. Each API process runs a single subscriber
+that fans the events out to whichever websocket connections are watching
+those tasks, so watching a job costs no database queries.
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+from collections import defaultdict
+from contextlib import asynccontextmanager
+
+import redis
+import redis.asyncio as aioredis
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
+CHANNEL_PREFIX = "analysis:"
+TERMINAL_STATUSES = ("completed", "failed")
+
+
+def channel_for(task_id: str) -> str:
+    return f"{CHANNEL_PREFIX}{task_id}"
+
+
+# --- Publishing (worker side) ---
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def _get_client() -> redis.Redis:
+    global _client, _client_pid
+    with _client_lock:
+        if _client is None or _client_pid != os.getpid():
+            _client = redis.Redis.from_url(REDIS_URL)
+            _client_pid = os.getpid()
+        return _client
+
+
+def publish_status(task_id: str, delta: dict):
+    """Publishes the fields of an analysis that changed. Failures are logged, never raised."""
+    if not task_id or not delta:
+        return
+    try:
+        _get_client().publish(channel_for(task_id), json.dumps(delta, default=str))
+    except Exception as e:
+        logger.warning(f"Could not publish status event for task {task_id}: {e}")
+
+
+# --- Subscribing (API side) ---
+
+class StatusBroadcaster:
+    """One Redis subscription per API process, fanned out to per-connection queues."""
+
+    def __init__(self, redis_url: str = REDIS_URL, queue_size: int = 256):
+        self.redis_url = redis_url
+        self.queue_size = queue_size
+        self._queues = defaultdict(set)
+        self._task = None
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _listen(self):
+        while True:
+            client = aioredis.from_url(self.redis_url, decode_responses=True)
+            pubsub = client.pubsub()
+            try:
+                await pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+                async for message in pubsub.listen():
+                    if message["type"] == "pmessage":
+                        self._dispatch(message["channel"][len(CHANNEL_PREFIX):], message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Status event subscription failed, reconnecting: {e}")
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+                await client.aclose()
+
+    def _dispatch(self, task_id: str, data: str):
+        queues = self._queues.get(task_id)
+        if not queues:
+            return
+        event = json.loads(data)
+        for queue in queues:
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                logger.warning(f"Dropping status event for task {task_id}: subscriber is not keeping up")
+
+    @asynccontextmanager
+    async def subscribe(self, task_id: str):
+        """Yields a queue that receives every event published for `task_id` while the context is open."""
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._queues[task_id].add(queue)
+        try:
+            yield queue
+        finally:
+            self._queues[task_id].discard(queue)
+            if not self._queues[task_id]:
+                del self._queues[task_id]
+
+
+broadcaster = StatusBroadcaster()
@@ -0,0 +1,166 @@
+"""
+Streaming ingestion.
+
+Instead of waiting for a complete download, yt-dlp only resolves the direct
+media URLs and ffmpeg reads them progressively: audio is decoded into
+fixed-length PCM windows and video into a low-rate stream of small raw frames,
+each available for processing as soon as it has arrived.
+
+A pipe only holds a couple of seconds of media, so the streams are read by a
+background thread into a bounded buffer; otherwise ffmpeg (and the download)
+would stall every time ASR or OCR is busy with the previous window.
+
+Configuration (environment):
+    STREAM_BUFFER_SECONDS  media read ahead of the extractors (default 30)
+"""
+import logging
+import math
+import os
+import queue
+import subprocess
+import tempfile
+import threading
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+import yt_dlp
+
+from app.services.audio import SAMPLE_RATE, iter_audio_chunks
+
+logger = logging.getLogger(__name__)
+
+# Keep reading through transient network hiccups instead of ending the stream early
+RECONNECT_ARGS = ["-reconnect", "1", "-reconnect_streamed", "1", "-reconnect_delay_max", "5"]
+
+STREAM_BUFFER_SECONDS = float(os.environ.get("STREAM_BUFFER_SECONDS", 30))
+
+_END = object()
+
+
+def prefetch(items: Iterator, max_buffered: int) -> Iterator:
+    """
+    Iterates `items` on a background thread, keeping up to `max_buffered` of them ready.
+    Errors raised by `items` are re-raised to the consumer; if the consumer stops early,
+    the producer stops at its next item and closes `items`.
+    """
+    buffer = queue.Queue(maxsize=max(1, max_buffered))
+    stopped = threading.Event()
+
+    def put(item) -> bool:
+        while not stopped.is_set():
+            try:
+                buffer.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for item in items:
+                if not put((item, None)):
+                    return
+        except Exception as e:
+            put((_END, e))
+            return
+        finally:
+            close = getattr(items, "close", None)
+            if close is not None:
+                close()
+        put((_END, None))
+
+    threading.Thread(target=produce, name="stream-prefetch", daemon=True).start()
+    try:
+        while True:
+            item, error = buffer.get()
+            if item is _END:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stopped.set()
+
+
+def resolve_stream(url: str, format_selector: str) -> dict:
+    """Resolves the direct media URL, request headers and dimensions of a single format."""
+    with yt_dlp.YoutubeDL({"quiet": True, "format": format_selector}) as ydl:
+        info = ydl.extract_info(url, download=False)
+    selected = (info.get("requested_formats") or [info])[0]
+    return {
+        "url": selected["url"],
+        "http_headers": selected.get("http_headers") or info.get("http_headers") or {},
+        "width": selected.get("width"),
+        "height": selected.get("height"),
+    }
+
+
+def _input_args(stream: dict) -> list:
+    args = []
+    if stream["url"].startswith("http"):
+        args += RECONNECT_ARGS
+    if stream["http_headers"]:
+        args += ["-headers", "".join(f"{k}: {v}\r\n" for k, v in stream["http_headers"].items())]
+    return args
+
+
+def iter_stream_audio(stream: dict, chunk_seconds: float) -> Iterator[np.ndarray]:
+    """Yields consecutive 16 kHz mono windows of `chunk_seconds` as they are downloaded."""
+    chunks = iter_audio_chunks(stream["url"], chunk_seconds, SAMPLE_RATE, input_args=_input_args(stream))
+    return prefetch(chunks, math.ceil(STREAM_BUFFER_SECONDS / chunk_seconds))
+
+
+def _probe_dimensions(stream: dict) -> Optional[Tuple[int, int]]:
+    command = [
+        "ffprobe", "-v", "error", *_input_args(stream), "-select_streams", "v:0",
+        "-show_entries", "stream=width,height", "-of", "csv=p=0:s=x", stream["url"],
+    ]
+    output = subprocess.run(command, capture_output=True, text=True).stdout.strip()
+    try:
+        width, height = (int(v) for v in output.splitlines()[0].split("x")[:2])
+        return width, height
+    except (ValueError, IndexError):
+        return None
+
+
+def iter_stream_frames(stream: dict, sample_fps: float, max_height: int) -> Iterator[Tuple[float, np.ndarray]]:
+    """
+    Yields (timestamp_seconds, BGR frame) `sample_fps` times per second while the video downloads.
+    Raises RuntimeError if the stream cannot be read or ffmpeg fails partway through.
+    """
+    return prefetch(_iter_frames(stream, sample_fps, max_height), math.ceil(STREAM_BUFFER_SECONDS * sample_fps))
+
+
+def _iter_frames(stream: dict, sample_fps: float, max_height: int) -> Iterator[Tuple[float, np.ndarray]]:
+    dimensions = (stream["width"], stream["height"]) if stream["width"] and stream["height"] else _probe_dimensions(stream)
+    if not dimensions:
+        raise RuntimeError("Could not determine the video dimensions of the stream")
+    width, height = dimensions
+    out_height = min(height, max_height) // 2 * 2
+    out_width = int(round(width * out_height / height / 2)) * 2
+    frame_bytes = out_width * out_height * 3
+
+    command = [
+        "ffmpeg", "-nostdin", "-loglevel", "error", *_input_args(stream), "-i", stream["url"],
+        "-an", "-vf", f"fps={sample_fps},scale={out_width}:{out_height}",
+        "-f", "rawvideo", "-pix_fmt", "bgr24", "-",
+    ]
+    with tempfile.TemporaryFile() as stderr:
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=stderr)
+        try:
+            index = 0
+            while True:
+                data = process.stdout.read(frame_bytes)
+                if len(data) < frame_bytes:
+                    break
+                yield index / sample_fps, np.frombuffer(data, np.uint8).reshape(out_height, out_width, 3)
+                index += 1
+            if process.wait() != 0:
+                stderr.seek(0)
+                message = stderr.read().decode(errors="ignore").strip()
+                raise RuntimeError(f"ffmpeg exited with code {process.returncode} while decoding video: {message}")
+        finally:
+            process.stdout.close()
+            if process.poll() is None:
+                process.kill()
+            process.wait()
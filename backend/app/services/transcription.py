@@ -0,0 +1,210 @@
+"""
+Speech-to-text engines.
+
+Models are loaded lazily, once per process, the first time a worker actually
+transcribes something (or when a Celery worker child warms up). Importing this
+module is cheap, so the API process never pays for a Whisper model it does not use.
+
+Configuration (environment):
+    WHISPER_BACKEND       "openai-whisper" (default) or "faster-whisper" (CTranslate2)
+    WHISPER_MODEL_SIZE    tiny, base (default), small, medium, ...
+    WHISPER_COMPUTE_TYPE  "fp32" (default) or "int8"
+    WHISPER_DEVICE        "cpu" (default) or "cuda"
+    WHISPER_CPU_THREADS   threads used by faster-whisper, 0 lets it decide
+    WHISPER_PROGRESS_WINDOW_SECONDS  window openai-whisper transcribes at a time when reporting progress (default 120);
+                                     each window ends at the quietest point of its last few seconds
+"""
+import abc
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+WHISPER_BACKEND = os.environ.get("WHISPER_BACKEND", "openai-whisper")
+WHISPER_MODEL_SIZE = os.environ.get("WHISPER_MODEL_SIZE", "base")
+WHISPER_COMPUTE_TYPE = os.environ.get("WHISPER_COMPUTE_TYPE", "fp32")
+WHISPER_DEVICE = os.environ.get("WHISPER_DEVICE", "cpu")
+WHISPER_CPU_THREADS = int(os.environ.get("WHISPER_CPU_THREADS", 0))
+WHISPER_PROGRESS_WINDOW_SECONDS = float(os.environ.get("WHISPER_PROGRESS_WINDOW_SECONDS", 120))
+
+SAMPLE_RATE = 16000
+
+# How far back from a window's nominal end to look for silence to cut at, and the loudness frame used
+WINDOW_CUT_SEARCH_SECONDS = 5.0
+WINDOW_CUT_FRAME_SECONDS = 0.1
+
+
+def window_bounds(audio: np.ndarray, window_seconds: float) -> list:
+    """
+    Splits audio into (start, end) sample ranges of about `window_seconds`, ending each
+    range at the quietest frame of its last seconds so words are not cut in half.
+    """
+    total = audio.shape[-1]
+    window = max(int(window_seconds * SAMPLE_RATE), 1)
+    search = int(WINDOW_CUT_SEARCH_SECONDS * SAMPLE_RATE)
+    frame = max(int(WINDOW_CUT_FRAME_SECONDS * SAMPLE_RATE), 1)
+    bounds, start = [], 0
+    while total - start > window:
+        nominal_end = start + window
+        search_start = max(start + 1, nominal_end - search)
+        frames = (nominal_end - search_start) // frame
+        if frames > 0:
+            tail = audio[..., search_start:search_start + frames * frame].reshape(frames, frame)
+            end = search_start + int(np.argmin((tail ** 2).mean(axis=1))) * frame + frame // 2
+        else:
+            end = nominal_end
+        bounds.append((start, end))
+        start = end
+    bounds.append((start, total))
+    return bounds
+
+
+@dataclass
+class TranscriptionResult:
+    text: str
+    audio_seconds: float
+    elapsed_seconds: float
+
+    @property
+    def real_time_factor(self) -> float:
+        """Processing time per second of audio; below 1.0 is faster than real time."""
+        return self.elapsed_seconds / self.audio_seconds if self.audio_seconds else 0.0
+
+
+class TranscriptionEngine(abc.ABC):
+    """Base class for a warm, per-process speech-to-text model."""
+    backend = None
+
+    def __init__(self, model_size: str, compute_type: str, device: str):
+        self.model_size = model_size
+        self.compute_type = compute_type
+        self.device = device
+        self.model = None
+        self.load_seconds = None
+        self._lock = threading.Lock()
+
+    @abc.abstractmethod
+    def _load_model(self):
+        """Loads and returns the backend's model."""
+
+    @abc.abstractmethod
+    def _transcribe(self, audio, on_progress) -> Tuple[str, float]:
+        """Returns the transcript and the length of the audio, in seconds."""
+
+    def load(self):
+        """Loads the model if it is not loaded yet and records how long it took."""
+        with self._lock:
+            if self.model is None:
+                start = time.perf_counter()
+                self.model = self._load_model()
+                self.load_seconds = time.perf_counter() - start
+                logger.info(
+                    f"Loaded {self.backend} model '{self.model_size}' ({self.compute_type}, {self.device}) "
+                    f"in {self.load_seconds:.2f}s"
+                )
+        return self.model
+
+    def transcribe(self, audio, on_progress=None) -> TranscriptionResult:
+        """
+        Transcribes an audio file path or a 16 kHz mono float32 array.
+        `on_progress`, if given, is called with the position reached so far, in seconds.
+        """
+        self.load()
+        start = time.perf_counter()
+        text, audio_seconds = self._transcribe(audio, on_progress)
+        result = TranscriptionResult(text=text.strip(), audio_seconds=audio_seconds, elapsed_seconds=time.perf_counter() - start)
+        logger.info(
+            f"Transcribed {result.audio_seconds:.1f}s of audio in {result.elapsed_seconds:.2f}s "
+            f"(RTF {result.real_time_factor:.2f}, {self.backend}/{self.model_size}/{self.compute_type})"
+        )
+        return result
+
+
+class OpenAIWhisperEngine(TranscriptionEngine):
+    backend = "openai-whisper"
+
+    def _load_model(self):
+        import whisper
+
+        model = whisper.load_model(self.model_size, device=self.device)
+        if self.compute_type == "int8" and self.device == "cpu":
+            import torch
+
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        return model
+
+    def _transcribe(self, audio, on_progress):
+        fp16 = self.device != "cpu" and self.compute_type != "int8"
+        if on_progress and hasattr(audio, "shape"):
+            return self._transcribe_windows(audio, on_progress, fp16)
+        result = self.model.transcribe(audio, fp16=fp16)
+        if hasattr(audio, "shape"):
+            audio_seconds = audio.shape[-1] / SAMPLE_RATE
+        else:
+            segments = result.get("segments") or []
+            audio_seconds = segments[-1]["end"] if segments else 0.0
+        return result["text"], audio_seconds
+
+    def _transcribe_windows(self, audio, on_progress, fp16):
+        # whisper.transcribe only returns once the whole input is decoded, so progress comes from
+        # transcribing windows cut at pauses; each is prompted with the previous window's text to keep context
+        texts = []
+        for start, end in window_bounds(audio, WHISPER_PROGRESS_WINDOW_SECONDS):
+            prompt = texts[-1] if texts else None
+            result = self.model.transcribe(audio[..., start:end], fp16=fp16, initial_prompt=prompt)
+            texts.append(result["text"].strip())
+            on_progress(end / SAMPLE_RATE)
+        return " ".join(text for text in texts if text), audio.shape[-1] / SAMPLE_RATE
+
+
+class FasterWhisperEngine(TranscriptionEngine):
+    backend = "faster-whisper"
+
+    def _load_model(self):
+        from faster_whisper import WhisperModel
+
+        compute_type = {"fp32": "float32", "int8": "int8"}.get(self.compute_type, self.compute_type)
+        return WhisperModel(self.model_size, device=self.device, compute_type=compute_type, cpu_threads=WHISPER_CPU_THREADS)
+
+    def _transcribe(self, audio, on_progress):
+        segments, info = self.model.transcribe(audio, beam_size=5)
+        texts = []
+        # Segments are decoded lazily, so progress can be reported as they come out
+        for segment in segments:
+            texts.append(segment.text)
+            if on_progress:
+                on_progress(segment.end)
+        return "".join(texts), info.duration
+
+
+ENGINES = {
+    OpenAIWhisperEngine.backend: OpenAIWhisperEngine,
+    FasterWhisperEngine.backend: FasterWhisperEngine,
+}
+
+_engine = None
+_engine_pid = None
+_engine_lock = threading.Lock()
+
+
+def get_transcription_engine() -> TranscriptionEngine:
+    """Returns this process's engine, creating it on first use (and again after a fork)."""
+    global _engine, _engine_pid
+    with _engine_lock:
+        if _engine is None or _engine_pid != os.getpid():
+            if WHISPER_BACKEND not in ENGINES:
+                raise ValueError(f"Unknown WHISPER_BACKEND '{WHISPER_BACKEND}', expected one of {sorted(ENGINES)}")
+            _engine = ENGINES[WHISPER_BACKEND](WHISPER_MODEL_SIZE, WHISPER_COMPUTE_TYPE, WHISPER_DEVICE)
+            _engine_pid = os.getpid()
+        return _engine
+
+
+def warm_up():
+    """Loads the model ahead of the first job so it does not count against that job's latency."""
+    get_transcription_engine().load()
@@ -0,0 +1,70 @@
+"""
+Per-user analysis aggregates.
+
+`user_analysis_stats` holds one row per user with running counts and reliability
+figures. Every code path that creates an analysis or moves one to a terminal
+status updates it with a single upsert, in the same transaction, so `/stats`
+reads one row however long the history is.
+"""
+from datetime import datetime
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.db.session import AnalysisResult, UserAnalysisStats
+from app.services.status_events import TERMINAL_STATUSES
+
+
+def _upsert(db: Session, user_id: int, reliability: float = None, **increments):
+    now = datetime.utcnow()
+    values = {"user_id": user_id, "last_activity_at": now, **increments}
+    if reliability is not None:
+        values.update(reliability_sum=reliability, reliability_count=1, reliability_min=reliability, reliability_max=reliability)
+
+    stmt = insert(UserAnalysisStats).values(**values)
+    table = UserAnalysisStats.__table__
+    update = {
+        name: table.c[name] + stmt.excluded[name]
+        for name in values
+        if name not in ("user_id", "last_activity_at", "reliability_min", "reliability_max")
+    }
+    update["last_activity_at"] = func.greatest(table.c.last_activity_at, stmt.excluded.last_activity_at)
+    if reliability is not None:
+        update["reliability_min"] = func.least(table.c.reliability_min, stmt.excluded.reliability_min)
+        update["reliability_max"] = func.greatest(table.c.reliability_max, stmt.excluded.reliability_max)
+    db.execute(stmt.on_conflict_do_update(index_elements=[table.c.user_id], set_=update))
+
+
+def record_created(db: Session, user_id: int):
+    _upsert(db, user_id, total_analyses=1)
+
+
+def record_finished(db: Session, analysis: AnalysisResult, previous_status: str, claim_count: int = 0):
+    """Counts an analysis that just completed or failed; a row that was already terminal is not counted twice."""
+    if previous_status in TERMINAL_STATUSES or analysis.status not in TERMINAL_STATUSES:
+        return
+    if analysis.status == "completed":
+        _upsert(db, analysis.owner_id, reliability=analysis.reliability_score, completed_count=1, claims_verified=claim_count)
+    else:
+        _upsert(db, analysis.owner_id, failed_count=1)
+
+
+def summarize(stats: UserAnalysisStats = None) -> dict:
+    """Shapes a stats row (or its absence, for a user with no analyses yet) for the API."""
+    if stats is None:
+        stats = UserAnalysisStats(
+            total_analyses=0, completed_count=0, failed_count=0,
+            reliability_sum=0.0, reliability_count=0, claims_verified=0,
+        )
+    return {
+        "total_analyses": stats.total_analyses,
+        "completed": stats.completed_count,
+        "failed": stats.failed_count,
+        "in_progress": stats.total_analyses - stats.completed_count - stats.failed_count,
+        "average_reliability": stats.reliability_sum / stats.reliability_count if stats.reliability_count else None,
+        "min_reliability": stats.reliability_min,
+        "max_reliability": stats.reliability_max,
+        "claims_verified": stats.claims_verified,
+        "last_activity_at": stats.last_activity_at,
+    }
@@ -0,0 +1,101 @@
+"""
+Canonical video identity.
+
+Maps the many URL shapes a platform uses for one video (share links, mobile
+hosts, Shorts/Reels paths, tracking parameters) onto a single
+`(platform, video_id)` key, so each video is stored and analyzed once.
+"""
+import re
+from dataclasses import dataclass
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+YOUTUBE_HOSTS = {"youtube.com", "m.youtube.com", "music.youtube.com", "youtube-nocookie.com"}
+YOUTUBE_ID = re.compile(r"^[A-Za-z0-9_-]{11}$")
+YOUTUBE_PATH_PREFIXES = ("shorts", "embed", "live", "v", "e")
+
+INSTAGRAM_HOSTS = {"instagram.com", "m.instagram.com"}
+INSTAGRAM_PATH = re.compile(r"^/(?:[A-Za-z0-9_.]+/)?(?:reel|reels|p|tv)/([A-Za-z0-9_-]+)")
+
+TIKTOK_HOSTS = {"tiktok.com", "m.tiktok.com"}
+TIKTOK_PATH = re.compile(r"^/(?:@[A-Za-z0-9_.]+/video|video|v)/(\d+)")
+
+# Query parameters that never change which video a URL points to.
+TRACKING_PARAMS = {"si", "feature", "fbclid", "gclid", "igshid", "igsh", "is_from_webapp", "sender_device", "pp", "ab_channel"}
+
+
+@dataclass(frozen=True)
+class CanonicalVideo:
+    platform: str
+    video_id: str
+    url: str
+
+
+def _host(netloc: str) -> str:
+    host = netloc.lower().split("@")[-1].split(":")[0]
+    return host[4:] if host.startswith("www.") else host
+
+
+def _youtube(host: str, path: str, query: dict):
+    candidate = None
+    if host == "youtu.be":
+        candidate = path.strip("/").split("/")[0]
+    elif host in YOUTUBE_HOSTS:
+        parts = [p for p in path.split("/") if p]
+        if parts and parts[0] == "watch":
+            candidate = query.get("v")
+        elif len(parts) >= 2 and parts[0] in YOUTUBE_PATH_PREFIXES:
+            candidate = parts[1]
+    if candidate and YOUTUBE_ID.match(candidate):
+        return CanonicalVideo("youtube", candidate, f"https://www.youtube.com/watch?v={candidate}")
+    return None
+
+
+def _instagram(host: str, path: str):
+    if host not in INSTAGRAM_HOSTS:
+        return None
+    match = INSTAGRAM_PATH.match(path)
+    if match:
+        shortcode = match.group(1)
+        return CanonicalVideo("instagram", shortcode, f"https://www.instagram.com/reel/{shortcode}/")
+    return None
+
+
+def _tiktok(host: str, path: str):
+    if host not in TIKTOK_HOSTS:
+        return None
+    match = TIKTOK_PATH.match(path)
+    if match:
+        # The username is not part of the identity; TikTok resolves /video/<id> for any user
+        video_id = match.group(1)
+        return CanonicalVideo("tiktok", video_id, f"https://www.tiktok.com/video/{video_id}")
+    return None
+
+
+def canonicalize_url(url: str) -> CanonicalVideo:
+    """
+    Returns the canonical identity of a video URL.
+    URLs on unrecognized platforms (or unresolved short links) fall back to the
+    normalized URL itself under the "web" platform.
+    Raises ValueError if the input is not an http(s) URL.
+    """
+    raw = url.strip()
+    if "://" not in raw:
+        raw = "https://" + raw
+    parts = urlsplit(raw)
+    if parts.scheme.lower() not in ("http", "https") or not parts.netloc:
+        raise ValueError(f"Not a valid video URL: {url}")
+
+    host = _host(parts.netloc)
+    path = re.sub(r"/{2,}", "/", parts.path) or "/"
+    query = dict(parse_qsl(parts.query, keep_blank_values=False))
+
+    identity = _youtube(host, path, query) or _instagram(host, path) or _tiktok(host, path)
+    if identity:
+        return identity
+
+    kept = sorted(
+        (k, v) for k, v in query.items()
+        if k.lower() not in TRACKING_PARAMS and not k.lower().startswith("utm_")
+    )
+    normalized = urlunsplit(("https", host, path.rstrip("/") or "/", urlencode(kept), ""))
+    return CanonicalVideo("web", normalized, normalized)
@@ -1,12 +1,18 @@
-import json
 import logging
 import os
+from datetime import datetime
 
 from celery import Celery
+from celery.signals import worker_process_init
+from sqlalchemy import delete, insert
 from sqlalchemy.orm import Session
 
 from app.services.ai_core import get_video_metadata, process_video, run_analysis
-from app.db.session import AnalysisResult, Claim, SessionLocal, Video
+from app.db.session import AgentLog, AnalysisResult, Claim, SessionLocal, Video, reset_engine_after_fork
+from app.models.schemas import AgentReportOutput
+from app.services import result_cache, transcription, user_stats
+from app.services.video_identity import canonicalize_url
+from app.worker.progress_reporter import AnalysisProgressReporter
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -15,6 +21,9 @@ logger = logging.getLogger(__name__)
 logger.error(os.environ.get("CELERY_BROKER_URL", "redis://localhost:6379/0"))
 logger.error(os.environ.get("CELERY_RESULT_BACKEND", "redis://localhost:6379/0"))
 
+# Rows per INSERT statement when saving the agent conversation
+AGENT_LOG_BATCH_SIZE = int(os.environ.get("AGENT_LOG_BATCH_SIZE", 500))
+
 celery_app = Celery(
     "tasks",
     broker=os.environ.get("CELERY_BROKER_URL", "redis://localhost:6379/0"),
@@ -24,6 +33,17 @@ celery_app = Celery(
 )
 
 
+@worker_process_init.connect
+def _warm_up_worker_process(**kwargs):
+    """Gives each worker child its own database connections and loads the transcription model once, before it takes jobs."""
+    reset_engine_after_fork()
+    if os.environ.get("WHISPER_PRELOAD", "true").lower() == "true":
+        try:
+            transcription.warm_up()
+        except Exception as e:
+            logger.error(f"Failed to preload transcription model: {e}")
+
+
 def _update_video_metadata(db: Session, video: Video):
     """Fetches and updates video metadata in the database."""
     try:
@@ -43,10 +63,10 @@ def _update_video_metadata(db: Session, video: Video):
         db.rollback()
 
 
-def _extract_text_from_video(video_url: str) -> (str, str):
+def _extract_text_from_video(video_url: str, reporter: AnalysisProgressReporter = None) -> (str, str):
     """Extracts text from the video, ensuring it's not empty."""
     logger.info(f"Starting text extraction for video: {video_url}")
-    extracted_text, error = process_video(video_url)
+    extracted_text, error = process_video(video_url, reporter)
     if error:
         logger.error(f"Error during text extraction for {video_url}: {error}")
         return None, error
@@ -60,27 +80,40 @@ def _extract_text_from_video(video_url: str) -> (str, str):
 
 def _save_analysis_results(
     db: Session, analysis: AnalysisResult, analysis_results: dict
-):
-    """Saves the analysis results to the database."""
+) -> int:
+    """Validates the analysis results and saves them to the database. Returns the number of claims saved."""
     logger.info(f"Saving analysis results for analysis ID {analysis.id}")
-    analysis.factual_report_json = json.dumps(
-        {"report": analysis_results.get("report", "")}
-    )
-    analysis.reliability_score = analysis_results.get("overall_score", 0.0)
-
-    # Clear existing claims to ensure idempotency
-    db.query(Claim).filter(Claim.analysis_result_id == analysis.id).delete()
-    db.flush()
-
-    for claim_data in analysis_results.get("claims", []):
-        claim = Claim(
-            claim_text=claim_data.get("claim"),
-            evidence_summary=claim_data.get("evidence_summary"),
-            score=claim_data.get("score"),
-            analysis_result_id=analysis.id,
-        )
-        db.add(claim)
+    if "error" in analysis_results:
+        raise ValueError(f"AI analysis failed: {analysis_results['error']}")
+    report = AgentReportOutput.model_validate(analysis_results)
+
+    analysis.factual_report_json = {"report": report.report}
+    analysis.reliability_score = report.overall_score
+
+    # Replace any claims from an earlier attempt (or published during the run), in one multi-row insert
+    db.execute(delete(Claim).where(Claim.analysis_result_id == analysis.id))
+    if report.claims:
+        db.execute(insert(Claim), [
+            {
+                "claim_text": claim_data.claim,
+                "evidence_summary": claim_data.evidence_summary,
+                "score": claim_data.score,
+                "analysis_result_id": analysis.id,
+            }
+            for claim_data in report.claims
+        ])
     logger.info(f"Successfully saved analysis results for analysis ID {analysis.id}")
+    return len(report.claims)
+
+
+def _save_agent_logs(db: Session, analysis_id: int, messages: list):
+    """Stores the agent conversation of an analysis, replacing the one of an earlier attempt."""
+    db.execute(delete(AgentLog).where(AgentLog.analysis_result_id == analysis_id))
+    for start in range(0, len(messages), AGENT_LOG_BATCH_SIZE):
+        db.execute(insert(AgentLog), [
+            {"agent_name": agent_name, "log_message": message, "analysis_result_id": analysis_id}
+            for agent_name, message in messages[start:start + AGENT_LOG_BATCH_SIZE]
+        ])
 
 
 @celery_app.task(bind=True)
@@ -90,6 +123,7 @@ def analyze_video_task(self, analysis_id: int):
     Orchestrates metadata fetching, text extraction, AI analysis, and result storage.
     """
     db = SessionLocal()
+    reporter = AnalysisProgressReporter(analysis_id)
     try:
         analysis = (
             db.query(AnalysisResult).filter(AnalysisResult.id == analysis_id).first()
@@ -100,31 +134,62 @@ def analyze_video_task(self, analysis_id: int):
 
         analysis.status = "processing"
         db.commit()
+        reporter.task_id = analysis.task_id
+        reporter.emit(status="processing")
 
         if analysis.video:
-            _update_video_metadata(db, analysis.video)
+            with reporter.stage("metadata"):
+                _update_video_metadata(db, analysis.video)
+            reporter.media_duration = analysis.video.duration_seconds
 
         # Step 1: Extract text from video
-        extracted_text, error = _extract_text_from_video(analysis.video.url)
+        extracted_text, error = _extract_text_from_video(analysis.video.url, reporter)
         if error:
             raise ValueError(error)
 
+        # Publish the transcript right away, before the agents start
         analysis.raw_text_extracted = extracted_text
-        analysis.progress = 0.5
+        analysis.content_hash = result_cache.content_hash(extracted_text)
+        analysis.pipeline_version = result_cache.PIPELINE_VERSION
+        analysis.stage_timings = dict(reporter.timings)
         db.commit()
+        reporter.emit(raw_text_extracted=extracted_text)
+
+        # Identical content may already have been analyzed under another URL
+        cached = result_cache.find_completed_by_content(db, analysis.content_hash, exclude_id=analysis.id)
+        if cached:
+            logger.info(f"Reusing analysis {cached.id} with identical content for analysis ID {analysis_id}")
+            result_cache.lock_video(db, analysis.video_id)
+            result_cache.copy_results(db, cached, analysis)
+            analysis.source_analysis_id = cached.id
+            db.flush()
+            result_cache.complete_followers(db, analysis)
+            db.commit()
+            reporter.emit(status="completed", progress=1.0, reliability_score=analysis.reliability_score)
+            return
 
         # Step 2: Run analysis on the extracted text
         logger.info(f"Running AI analysis for analysis ID {analysis_id}")
-        analysis_results = run_analysis(extracted_text)
+        analysis_results = run_analysis(extracted_text, tracker=reporter)
         if not analysis_results:
             raise ValueError("AI analysis returned no results.")
 
-        # Step 3: Save the analysis results
-        _save_analysis_results(db, analysis, analysis_results)
+        # Step 3: Save the analysis results, committed together with the status update below
+        claim_count = _save_analysis_results(db, analysis, analysis_results)
+        _save_agent_logs(db, analysis.id, reporter.messages)
 
+        result_cache.lock_video(db, analysis.video_id)
+        previous_status = analysis.status
         analysis.status = "completed"
         analysis.progress = 1.0
+        analysis.stage_timings = dict(reporter.timings)
+        analysis.completed_at = datetime.utcnow()
+        user_stats.record_finished(db, analysis, previous_status, claim_count=claim_count)
+        db.flush()
+        result_cache.complete_followers(db, analysis)
         db.commit()
+        reporter.emit(status="completed", progress=1.0, reliability_score=analysis.reliability_score,
+                      stage_timings=analysis.stage_timings)
         logger.info(f"Analysis task {analysis_id} completed successfully.")
 
     except Exception as e:
@@ -135,9 +200,17 @@ def analyze_video_task(self, analysis_id: int):
             db.query(AnalysisResult).filter(AnalysisResult.id == analysis_id).first()
         )
         if analysis_to_fail:
+            result_cache.lock_video(db, analysis_to_fail.video_id)
+            previous_status = analysis_to_fail.status
             analysis_to_fail.status = "failed"
             analysis_to_fail.error_message = str(e)
+            analysis_to_fail.stage_timings = dict(reporter.timings)
+            user_stats.record_finished(db, analysis_to_fail, previous_status)
+            result_cache.fail_followers(db, analysis_to_fail, str(e))
+            _save_agent_logs(db, analysis_id, reporter.messages)
             db.commit()
+            reporter.task_id = analysis_to_fail.task_id
+            reporter.emit(status="failed", error_message=str(e))
         # Update Celery task state for monitoring
         self.update_state(
             state="FAILURE", meta={"exc_type": type(e).__name__, "exc_message": str(e)}
@@ -167,7 +240,8 @@ if __name__ == "__main__":
     mock_task_instance = MockTask()
 
     # 2. Create temporary test data
-    test_video = Video(url=TEST_VIDEO_URL)  # Assuming a user_id of 1
+    test_identity = canonicalize_url(TEST_VIDEO_URL)
+    test_video = Video(url=test_identity.url, platform=test_identity.platform, platform_video_id=test_identity.video_id)
     test_db.add(test_video)
     test_db.commit()
     test_db.refresh(test_video)
@@ -0,0 +1,104 @@
+import logging
+import os
+import threading
+import time
+
+from sqlalchemy import and_, or_
+
+from app.db.session import AnalysisResult, Claim, SessionLocal
+from app.services.progress import StageTracker
+from app.services.result_cache import IN_FLIGHT_STATUSES
+from app.services.status_events import publish_status
+
+logger = logging.getLogger(__name__)
+
+# Minimum seconds between two progress writes within a stage; stage boundaries are always written.
+PROGRESS_MIN_INTERVAL = float(os.environ.get("PROGRESS_MIN_INTERVAL", 1.0))
+
+
+class AnalysisProgressReporter(StageTracker):
+    """
+    Persists stage progress and partial results of one analysis while its task runs,
+    and publishes what changed to the task's status channel.
+    Writes go through their own short-lived sessions so they are safe from the
+    extraction threads and never interfere with the task's own session.
+    """
+
+    def __init__(self, analysis_id: int, task_id: str = None, media_duration: float = None,
+                 min_interval: float = PROGRESS_MIN_INTERVAL):
+        super().__init__(media_duration)
+        self.analysis_id = analysis_id
+        self.task_id = task_id
+        self.min_interval = min_interval
+        self._last_write = 0.0
+        self._published = {}
+        self._write_lock = threading.Lock()
+
+    def emit(self, **fields):
+        """Publishes the given fields, skipping those whose value was already published."""
+        with self._write_lock:
+            delta = {k: v for k, v in fields.items() if self._published.get(k, object()) != v}
+            self._published.update(delta)
+        publish_status(self.task_id, delta)
+
+    def _targets(self):
+        # The analysis itself and every request waiting on it
+        return or_(
+            AnalysisResult.id == self.analysis_id,
+            and_(
+                AnalysisResult.source_analysis_id == self.analysis_id,
+                AnalysisResult.status.in_(IN_FLIGHT_STATUSES),
+            ),
+        )
+
+    def _write(self, values: dict):
+        db = SessionLocal()
+        try:
+            db.query(AnalysisResult).filter(self._targets()).update(values, synchronize_session=False)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Could not write progress for analysis ID {self.analysis_id}: {e}")
+        finally:
+            db.close()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"progress": self.progress, "stage": self.current_stage, "stage_timings": dict(self.timings)}
+
+    def _on_change(self, force: bool):
+        with self._write_lock:
+            now = time.monotonic()
+            if not force and now - self._last_write < self.min_interval:
+                return
+            self._last_write = now
+            snapshot = self.snapshot()
+            self._write(snapshot)
+        self.emit(**snapshot)
+
+    def publish(self, **fields):
+        with self._write_lock:
+            self._write(fields)
+        self.emit(**fields)
+
+    def publish_claims(self, claims: list):
+        """
+        Stores the extracted claims right away on the analysis and every request waiting on it;
+        evidence and scores are filled in on completion, when the followers' claims are replaced by a copy.
+        """
+        db = SessionLocal()
+        try:
+            analysis_ids = [analysis_id for (analysis_id,) in db.query(AnalysisResult.id).filter(self._targets())]
+            db.query(Claim).filter(Claim.analysis_result_id.in_(analysis_ids)).delete(synchronize_session=False)
+            db.add_all(
+                Claim(claim_text=claim, analysis_result_id=analysis_id)
+                for analysis_id in analysis_ids
+                for claim in claims
+            )
+            db.commit()
+            self.emit(claims=[{"claim_text": claim} for claim in claims])
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Could not publish claims for analysis ID {self.analysis_id}: {e}")
+        finally:
+            db.close()
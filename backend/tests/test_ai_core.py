@@ -0,0 +1,24 @@
+import pytest
+
+from app.services.ai_core import _fallback_report, _parse_claim_list, _parse_json_object
+
+# Verdicts are read out of replies wrapped in Markdown fences or surrounded by text
+@pytest.mark.parametrize("reply", [
+    '{"claim": "c", "evidence_summary": "e", "score": 40}',
+    '```json\n{"claim": "c", "evidence_summary": "e", "score": 40}\n```',
+    'Here is the verdict: {"claim": "c", "evidence_summary": "e", "score": 40} TERMINATE',
+])
+def test_parse_json_object(reply):
+    assert _parse_json_object(reply)["score"] == 40
+
+# Only non-empty string claims are kept from the extractor's array; a reply without one is rejected
+def test_parse_claim_list():
+    assert _parse_claim_list('Claims: ["Water boils at 100C", "", 3]') == ["Water boils at 100C"]
+    with pytest.raises(ValueError):
+        _parse_claim_list("no claims here")
+
+# The computed summary counts unverified claims without averaging them in
+def test_fallback_report():
+    verdicts = [{"score": 80.0}, {"score": None}]
+    assert _fallback_report(verdicts, 80.0) == "1 of 2 claims were checked, with an average reliability of 80/100."
+    assert _fallback_report([], None) == "No verifiable factual claims were found."
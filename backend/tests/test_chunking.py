@@ -0,0 +1,39 @@
+from app.services.chunking import chunk_text, merge_claims, split_sentences
+
+def test_split_sentences_on_punctuation_and_lines():
+    assert split_sentences("One. Two? Three!\nOCR line") == ["One.", "Two?", "Three!", "OCR line"]
+
+# Every chunk stays within the limit and repeats the tail of the previous one
+def test_chunks_are_bounded_and_overlap():
+    text = " ".join(f"Sentence number {i} is here." for i in range(200))
+    chunks = chunk_text(text, max_chars=300, overlap=1)
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 300 for chunk in chunks)
+    for previous, current in zip(chunks, chunks[1:]):
+        assert current.split(". ")[0] + "." == previous.split(". ")[-1]
+
+def test_short_text_is_one_chunk():
+    assert chunk_text("Short text.", max_chars=100) == ["Short text."]
+    assert chunk_text("   ", max_chars=100) == []
+
+def test_unpunctuated_text_is_cut_between_words():
+    chunks = chunk_text("word " * 500, max_chars=100, overlap=0)
+    assert all(len(chunk) <= 100 for chunk in chunks)
+
+# Duplicate and near-duplicate claims from overlapping chunks are merged
+def test_merge_claims():
+    merged = merge_claims([
+        ["Juice fasts detox your liver.", "Water boils at 100 degrees Celsius."],
+        ["juice fasts detox your liver", "Juice fasts really detox your liver.", "The moon is made of cheese."],
+    ])
+    assert merged == ["Juice fasts detox your liver.", "Water boils at 100 degrees Celsius.", "The moon is made of cheese."]
+
+# A negated claim or one with a different number is a different claim, however similar the wording
+def test_merge_claims_keeps_negations_and_numbers():
+    claims = [
+        "Drinking lemon water every morning does detox your liver and kidneys.",
+        "Drinking lemon water every morning does not detox your liver and kidneys.",
+        "Take 5 mg of melatonin one hour before you go to bed.",
+        "Take 50 mg of melatonin one hour before you go to bed.",
+    ]
+    assert merge_claims([claims]) == claims
@@ -0,0 +1,13 @@
+import numpy as np
+
+from app.services.claim_store import ClaimIndex
+
+# The closest stored claims are returned with their cosine similarity, closest first
+def test_claim_index_search():
+    index = ClaimIndex(dim=2)
+    assert index.search(np.array([[1.0, 0.0]])) == [[]]
+    index.add([10, 20], np.array([[1.0, 0.0], [0.0, 1.0]]))
+    first, second = index.search(np.array([[0.8, 0.6], [0.0, 1.0]]), k=2)
+    assert [claim_id for claim_id, _ in first] == [10, 20]
+    assert abs(first[0][1] - 0.8) < 1e-6 and abs(first[1][1] - 0.6) < 1e-6
+    assert second[0][0] == 20
@@ -0,0 +1,12 @@
+from app.services.claim_text import claim_guards, normalize_claim
+
+# Case, punctuation and spacing do not make a different claim
+def test_normalize_claim():
+    assert normalize_claim("Juice fasts  DETOX your liver!") == normalize_claim("juice fasts detox your liver")
+
+# Negations and numbers tell apart claims that are otherwise worded alike
+def test_claim_guards():
+    assert claim_guards("Vitamin C doesn't cure colds") == claim_guards("Vitamin C does not cure colds")
+    assert claim_guards("Vitamin C cures colds") != claim_guards("Vitamin C does not cure colds")
+    assert claim_guards("Take 5 mg of zinc daily") != claim_guards("Take 50 mg of zinc daily")
+    assert claim_guards("1,000 people took part") == claim_guards("1000 people took part")
@@ -0,0 +1,13 @@
+import numpy as np
+from app.services.frame_sampling import dedupe_lines, dhash, hamming
+
+# Repeated caption lines (case, punctuation and spacing differences) are kept once
+def test_dedupe_lines():
+    texts = ["Juice fasts DETOX your liver!\n|", "juice fasts detox your  liver\nSubscribe", "Subscribe"]
+    assert dedupe_lines(texts) == ["Juice fasts DETOX your liver!", "Subscribe"]
+
+# Identical frames hash identically, different content does not
+def test_dhash_distance():
+    gradient = np.tile(np.arange(0, 256, 4, dtype=np.uint8), (48, 1))
+    assert hamming(dhash(gradient), dhash(gradient.copy())) == 0
+    assert hamming(dhash(gradient), dhash(gradient[:, ::-1].copy())) > 6
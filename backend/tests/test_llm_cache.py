@@ -0,0 +1,112 @@
+import os
+
+from app.services import llm
+from app.services.llm import RedisLLMCache, cache_key
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+    def perf_counter(self):
+        return self.now
+
+class FakeRedis:
+    """The few Redis commands the LLM cache uses, in memory and without expiry."""
+    def __init__(self):
+        self.values, self.zsets, self.hashes = {}, {}, {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value, ex=None):
+        self.values[key] = value
+
+    def expire(self, key, seconds):
+        return key in self.values
+
+    def delete(self, *keys):
+        for key in keys:
+            self.values.pop(key, None)
+
+    def zadd(self, key, mapping):
+        self.zsets.setdefault(key, {}).update(mapping)
+
+    def zcard(self, key):
+        return len(self.zsets.get(key, {}))
+
+    def zremrangebyscore(self, key, low, high):
+        zset = self.zsets.get(key, {})
+        removed = [member for member, score in zset.items() if score <= high]
+        for member in removed:
+            del zset[member]
+        return len(removed)
+
+    def zpopmin(self, key, count):
+        zset = self.zsets.get(key, {})
+        popped = sorted(zset.items(), key=lambda item: item[1])[:count]
+        for member, _ in popped:
+            del zset[member]
+        return popped
+
+    def hincrby(self, key, field, amount):
+        hash_ = self.hashes.setdefault(key, {})
+        hash_[field] = int(hash_.get(field, 0)) + amount
+
+    def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis, self.calls = redis, []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append((name, args, kwargs))
+
+    def execute(self):
+        return [getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+def make_cache(monkeypatch, **kwargs):
+    clock = FakeClock()
+    monkeypatch.setattr(llm, "time", clock)
+    cache = RedisLLMCache(url="redis://unused", **kwargs)
+    cache._redis, cache._redis_pid = FakeRedis(), os.getpid()
+    return cache, clock
+
+# The key covers model, messages and tools, and not the order of keys within them
+def test_cache_key_composition():
+    messages = [{"role": "user", "content": "Is water wet?"}]
+    key = cache_key("model-a", messages, [{"name": "search", "type": "function"}])
+    assert key == cache_key("model-a", messages, [{"type": "function", "name": "search"}])
+    assert key != cache_key("model-b", messages, [{"name": "search", "type": "function"}])
+    assert key != cache_key("model-a", [{"role": "user", "content": "Is fire hot?"}], [{"name": "search", "type": "function"}])
+    assert key != cache_key("model-a", messages)
+
+# Misses, hits and size-based eviction of the least recently used entry are counted
+def test_hits_misses_and_eviction(monkeypatch):
+    cache, clock = make_cache(monkeypatch, ttl=3600, max_entries=2)
+    assert cache.get("a") is None
+    cache.set("a", "reply a")
+    clock.now += 1
+    cache.set("b", "reply b")
+    clock.now += 1
+    assert cache.get("a") == "reply a"  # "a" is now the most recently used
+    clock.now += 1
+    cache.set("c", "reply c")
+    assert cache.get("b") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"], stats["entries"]) == (1, 2, 1, 2)
+    assert stats["hit_rate"] == 1 / 3
+
+# Keys that expired through the TTL no longer count as entries
+def test_expired_entries_are_pruned(monkeypatch):
+    cache, clock = make_cache(monkeypatch, ttl=100, max_entries=10)
+    cache.set("a", "reply a")
+    clock.now += 200
+    cache.set("b", "reply b")
+    assert cache.stats()["entries"] == 1
@@ -0,0 +1,10 @@
+from app.db import migrations
+
+# The module imports cleanly and every step is either SQL or a callable
+def test_migrations_are_well_formed():
+    names = [name for name, _ in migrations.MIGRATIONS]
+    assert names == sorted(names)
+    assert len(names) == len(set(names))
+    for _, steps in migrations.MIGRATIONS:
+        assert steps
+        assert all(isinstance(step, str) or callable(step) for step in steps)
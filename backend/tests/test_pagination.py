@@ -0,0 +1,15 @@
+from datetime import datetime
+
+import pytest
+
+from app.services.pagination import decode_cursor, encode_cursor
+
+# A cursor decodes back to the exact sort key it was built from
+def test_cursor_round_trip():
+    created_at = datetime(2025, 8, 1, 12, 30, 15, 123456)
+    assert decode_cursor(encode_cursor(created_at, 42)) == (created_at, 42)
+
+@pytest.mark.parametrize("cursor", ["", "not-a-cursor", "MjAyNS0wOC0wMQ"])
+def test_invalid_cursor(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
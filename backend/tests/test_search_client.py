@@ -0,0 +1,82 @@
+import threading
+import time
+
+from app.services.search_client import (
+    RELEASE_LOCK_SCRIPT, TOKEN_BUCKET_SCRIPT, SearchClient, StubSearchBackend, format_results, normalize_query,
+)
+
+class CountingBackend(StubSearchBackend):
+    def __init__(self):
+        self.calls = 0
+        self.release = threading.Event()
+
+    def search(self, query, num):
+        self.calls += 1
+        self.release.wait(timeout=5)
+        return super().search(query, num)
+
+# Spacing and case do not make a different query
+def test_normalize_query():
+    assert normalize_query("  Juice  Fasts DETOX ") == "juice fasts detox"
+
+def test_stub_results_are_formatted():
+    client = SearchClient(StubSearchBackend(), redis_url=None)
+    text = format_results(client.search("juice fasts", num=2))
+    assert "Result 2:" in text and "example.com" in text
+    assert format_results([]) == "No search results found."
+
+# Concurrent identical queries in one process share a single backend request
+def test_concurrent_queries_are_coalesced():
+    backend = CountingBackend()
+    client = SearchClient(backend, redis_url=None)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(client.search("same claim", num=1))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.2) # let every thread reach the in-flight request
+    backend.release.set()
+    for thread in threads:
+        thread.join()
+    assert len(results) == 4
+    assert backend.calls == 1
+
+class LockRedis:
+    """Just enough Redis for the cross-worker lock: SET NX, GET, EXISTS and the lock scripts."""
+    def __init__(self):
+        self.values = {}
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.values:
+            return None
+        self.values[key] = value
+        return True
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def exists(self, key):
+        return int(key in self.values)
+
+    def eval(self, script, numkeys, key, *args):
+        if script == TOKEN_BUCKET_SCRIPT:
+            return 0
+        if self.values.get(key) != args[0]:
+            return 0
+        if script == RELEASE_LOCK_SCRIPT:
+            del self.values[key]
+        return 1
+
+# An owner whose lock lapsed does not release the lock another worker took over
+def test_lock_release_keeps_another_owners_lock():
+    client = SearchClient(StubSearchBackend(), redis_url=None)
+    client._redis = LockRedis()
+    lock_key = client._key("same claim", 1) + ":lock"
+
+    class TakeoverBackend(StubSearchBackend):
+        def search(self, query, num):
+            client._redis.values[lock_key] = "another worker"
+            return super().search(query, num)
+
+    client.backend = TakeoverBackend()
+    client.search("same claim", num=1)
+    assert client._redis.values[lock_key] == "another worker"
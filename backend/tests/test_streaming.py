@@ -0,0 +1,34 @@
+import threading
+
+import pytest
+
+from app.services.streaming import prefetch
+
+# Items arrive in order and errors from the producer reach the consumer
+def test_prefetch_order_and_errors():
+    assert list(prefetch(iter(range(10)), 3)) == list(range(10))
+
+    def failing():
+        yield 1
+        raise RuntimeError("stream broke off")
+
+    items = prefetch(failing(), 2)
+    assert next(items) == 1
+    with pytest.raises(RuntimeError, match="stream broke off"):
+        next(items)
+
+# Abandoning the iterator stops the producer and closes its source
+def test_prefetch_stops_producer():
+    closed = threading.Event()
+
+    def endless():
+        try:
+            while True:
+                yield 0
+        finally:
+            closed.set()
+
+    items = prefetch(endless(), 1)
+    next(items)
+    items.close()
+    assert closed.wait(timeout=5)
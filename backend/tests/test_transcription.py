@@ -0,0 +1,11 @@
+import numpy as np
+from app.services.transcription import SAMPLE_RATE, window_bounds
+
+# Windows cover the audio without gaps and end in the pause before the nominal boundary
+def test_window_bounds_cut_at_silence():
+    audio = np.ones(300 * SAMPLE_RATE, dtype=np.float32)
+    audio[117 * SAMPLE_RATE:118 * SAMPLE_RATE] = 0.0
+    bounds = window_bounds(audio, 120)
+    assert bounds[0][0] == 0 and bounds[-1][1] == len(audio)
+    assert all(end == next_start for (_, end), (next_start, _) in zip(bounds, bounds[1:]))
+    assert 117 * SAMPLE_RATE <= bounds[0][1] <= 118 * SAMPLE_RATE
@@ -0,0 +1,33 @@
+import asyncio
+from datetime import datetime
+
+from app.core import user_cache
+from app.models import schemas
+
+def _user(user_id):
+    return schemas.User(id=user_id, username=f"user{user_id}", email=f"user{user_id}@example.com", created_at=datetime(2025, 1, 1), updated_at=None)
+
+# A cached user is served until it expires or is invalidated
+def test_get_set_invalidate(monkeypatch):
+    monkeypatch.setattr(user_cache, "USER_CACHE_TTL_SECONDS", 60)
+    asyncio.run(user_cache.set_user(_user(1)))
+    assert asyncio.run(user_cache.get_user(1)).username == "user1"
+    asyncio.run(user_cache.invalidate_user(1))
+    assert asyncio.run(user_cache.get_user(1)) is None
+
+def test_expired_entry(monkeypatch):
+    monkeypatch.setattr(user_cache, "USER_CACHE_TTL_SECONDS", -1)
+    user_cache._remember_local(_user(2))
+    monkeypatch.setattr(user_cache, "USER_CACHE_TTL_SECONDS", 60)
+    assert asyncio.run(user_cache.get_user(2)) is None
+
+# The least recently used user is evicted first
+def test_lru_eviction(monkeypatch):
+    monkeypatch.setattr(user_cache, "USER_CACHE_SIZE", 2)
+    monkeypatch.setattr(user_cache, "USER_CACHE_TTL_SECONDS", 60)
+    for user_id in (3, 4):
+        asyncio.run(user_cache.set_user(_user(user_id)))
+    asyncio.run(user_cache.get_user(3))
+    asyncio.run(user_cache.set_user(_user(5)))
+    assert asyncio.run(user_cache.get_user(4)) is None
+    assert asyncio.run(user_cache.get_user(3)) is not None
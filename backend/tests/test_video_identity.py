@@ -0,0 +1,49 @@
+from app.services.video_identity import canonicalize_url
+import pytest
+
+# YouTube URL variants all map to the same video
+@pytest.mark.parametrize("url", [
+    "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+    "https://m.youtube.com/watch?v=dQw4w9WgXcQ&si=abc123&t=42",
+    "https://youtu.be/dQw4w9WgXcQ?si=abc123",
+    "https://youtube.com/shorts/dQw4w9WgXcQ",
+    "youtube.com/embed/dQw4w9WgXcQ",
+])
+def test_youtube_variants(url):
+    identity = canonicalize_url(url)
+    assert identity.platform == "youtube"
+    assert identity.video_id == "dQw4w9WgXcQ"
+    assert identity.url == "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+
+# Instagram Reels, with and without the username prefix
+@pytest.mark.parametrize("url", [
+    "https://www.instagram.com/reel/C1a2B3c4D5e/?igsh=xyz",
+    "https://instagram.com/reels/C1a2B3c4D5e",
+    "https://www.instagram.com/someone/reel/C1a2B3c4D5e/",
+])
+def test_instagram_variants(url):
+    identity = canonicalize_url(url)
+    assert (identity.platform, identity.video_id) == ("instagram", "C1a2B3c4D5e")
+
+# TikTok video pages and short /v/ links share one canonical URL
+@pytest.mark.parametrize("url", [
+    "https://www.tiktok.com/@some.user/video/7234567890123456789?is_from_webapp=1",
+    "https://m.tiktok.com/v/7234567890123456789.html",
+    "tiktok.com/video/7234567890123456789",
+])
+def test_tiktok_variants(url):
+    identity = canonicalize_url(url)
+    assert (identity.platform, identity.video_id) == ("tiktok", "7234567890123456789")
+    assert identity.url == "https://www.tiktok.com/video/7234567890123456789"
+
+# Unknown platforms fall back to a normalized URL without tracking parameters
+def test_generic_url_normalization():
+    a = canonicalize_url("https://Example.com/clip/?utm_source=x&b=2&a=1#t=3")
+    b = canonicalize_url("https://www.example.com/clip?a=1&b=2")
+    assert a.platform == "web"
+    assert a.video_id == b.video_id == "https://example.com/clip?a=1&b=2"
+
+# Non-http input is rejected
+def test_invalid_url():
+    with pytest.raises(ValueError):
+        canonicalize_url("ftp://example.com/video")
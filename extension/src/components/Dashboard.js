@@ -173,9 +173,11 @@ export const Dashboard = () => {
           <p className="text-gray-700 dark:text-gray-300 mb-4 leading-relaxed">{analysisReport.report}</p>
           <div className="flex justify-between items-center mb-4">
             <p className="text-lg font-semibold text-gray-800 dark:text-gray-200">
-              Overall Score: <span className="text-blue-600 dark:text-blue-400">{analysisReport.reliability_score}</span>
+              Overall Score: <span className="text-blue-600 dark:text-blue-400">{analysisReport.reliability_score ?? 'N/A'}</span>
             </p>
-            {analysisReport.reliability_score >= 70 ? (
+            {analysisReport.reliability_score == null ? (
+              <span className="text-lg font-bold text-gray-500 dark:text-gray-400">UNVERIFIED</span>
+            ) : analysisReport.reliability_score >= 70 ? (
               <div className="flex items-center">
                 <svg className="h-8 w-8 text-green-500 mr-1" fill="none" viewBox="0 0 24 24" stroke="currentColor" strokeWidth="2">
                   <path strokeLinecap="round" strokeLinejoin="round" d="M9 12l2 2 4-4m6 2a9 9 0 11-18 0 9 9 0 0118 0z" />
@@ -193,8 +195,11 @@ export const Dashboard = () => {
           </div>
           <h4 className="text-lg font-bold mb-3 text-gray-900 dark:text-gray-100">Claims:</h4>
           {analysisReport.claims.map((claim, index) => {
-            const scoreColorClass =
-              claim.score >= 80
+            // Claims that could not be checked have no score
+            const unverified = claim.score == null;
+            const scoreColorClass = unverified
+              ? 'bg-gray-200 text-gray-700 dark:bg-gray-700 dark:text-gray-200'
+              : claim.score >= 80
                 ? 'bg-green-200 text-green-800 dark:bg-green-700 dark:text-green-100'
                 : claim.score >= 50
                 ? 'bg-yellow-200 text-yellow-800 dark:bg-yellow-700 dark:text-yellow-100'
@@ -211,7 +216,7 @@ export const Dashboard = () => {
                     <span className="font-medium">Score:</span>
                   </p>
                   <span className={`px-4 py-1 rounded-full text-sm font-bold ${scoreColorClass}`}>
-                    {claim.score}
+                    {unverified ? 'Unverified' : claim.score}
                   </span>
                 </div>
               </div>